@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+解析后端基准测试
+比较各后端的速度（页/秒、MB/秒）以及召回率和准确率
+页面来自页面归档时没有真实答案，只输出相对所有后端结果并集的召回率；
+没有归档时使用带真实答案的合成论坛页面，任一后端召回率或准确率不到100%视为回归，返回非零退出码
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+from page_archive import PageArchive
+from image_extractors import available_backends, extract_pages, get_extractor
+
+
+def synthetic_pages(count=200, images_per_page=40, seed=0):
+    """
+    生成类似Discuz!帖子的页面，包含各种懒加载写法
+    返回 (页面列表, 每页真实图片链接集合列表)
+    """
+    rng = random.Random(seed)
+    hosts = ['66img.cc', 'qpic.ws', 'imgbox.com', 'postimg.cc', 'pixhost.org']
+    # (写法, 真实图片链接)
+    templates = [
+        ('<img src="https://{h}/{p}.jpg">', ['https://{h}/{p}.jpg']),
+        ('<img src="/static/loading.gif" data-src="https://{h}/{p}.png">', ['https://{h}/{p}.png']),
+        ('<img ess-data="https://{h}/{p}.jpg" src="blank.gif">', ['https://{h}/{p}.jpg']),
+        ('<img file="https://{h}/{p}.webp" zoomfile="https://{h}/{p}_full.webp">',
+         ['https://{h}/{p}.webp', 'https://{h}/{p}_full.webp']),
+        ('<img data-original=\'https://{h}/{p}.jpeg\' class="lazy">', ['https://{h}/{p}.jpeg']),
+        ('<a href="https://{h}/{p}.gif" target="_blank">[原图]</a>', ['https://{h}/{p}.gif']),
+        ('[img]https://{h}/{p}.jpg[/img]', ['https://{h}/{p}.jpg']),
+        # 图床常见的尺寸/样式后缀，后缀是链接的一部分
+        ('<a href="https://{h}/{p}.jpg!web">[原图]</a>', ['https://{h}/{p}.jpg!web']),
+        ('https://{h}/{p}.jpg:large', ['https://{h}/{p}.jpg:large']),
+        ('<a href="https://{h}/{p}.png&amp;size=orig">[原图]</a>', ['https://{h}/{p}.png&size=orig']),
+    ]
+    pages = []
+    truths = []
+    for page_no in range(count):
+        posts = []
+        truth = set()
+        for post_no in range(4):
+            images = []
+            for _ in range(images_per_page // 4):
+                path = f"{rng.getrandbits(48):012x}"
+                host = rng.choice(hosts)
+                markup, urls = rng.choice(templates)
+                images.append(markup.format(h=host, p=path))
+                truth.update(url.format(h=host, p=path) for url in urls)
+            filler = '<p>' + '回复内容 ' * rng.randint(20, 80) + '</p>'
+            posts.append(
+                f'<div class="tpc_content" id="postmessage_{page_no}_{post_no}">'
+                f'{filler}{"<br>".join(images)}</div>'
+            )
+        html = (
+            '<html><head><script>var logo="https://example.com/logo.png";</script></head>'
+            '<body><img src="/images/avatar/1.png">' + ''.join(posts) + '</body></html>'
+        )
+        pages.append((html, f'https://forum.example.com/read.php?tid={page_no}'))
+        truths.append(truth)
+    return pages, truths
+
+
+def load_archive_pages(archive_dir, limit=None):
+    archive = PageArchive(archive_dir)
+    pages = []
+    for entry in archive.entries():
+        _, body = archive.read(entry)
+        pages.append((body.decode('utf-8', errors='replace'), entry['url']))
+        if limit and len(pages) >= limit:
+            break
+    return pages
+
+
+def run_backend(backend, pages, workers, rounds):
+    """返回 (最佳耗时秒数, 每页链接集合列表)"""
+    best = None
+    results = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        results = [set(urls) for urls in extract_pages(pages, backend, workers=workers)]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='解析后端基准测试')
+    parser.add_argument('--archive', help='页面归档目录（默认使用合成页面）')
+    parser.add_argument('--limit', type=int, default=None, help='最多使用的页面数')
+    parser.add_argument('--pages', type=int, default=200, help='合成页面数量')
+    parser.add_argument('--backends', nargs='+', default=None, help='参与测试的后端（默认全部可用后端）')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1],
+                        help='进程数，可指定多个')
+    parser.add_argument('--rounds', type=int, default=3, help='每项重复次数，取最快一次')
+    args = parser.parse_args()
+
+    # 合成页面有真实答案；归档页面以所有后端结果的并集作为参考
+    truths = None
+    if args.archive:
+        pages = load_archive_pages(args.archive, args.limit)
+        source = args.archive
+    else:
+        pages, truths = synthetic_pages(args.pages)
+        source = '合成页面'
+    if not pages:
+        print("没有可用页面")
+        return 0
+
+    backends = args.backends or available_backends()
+    for backend in backends:
+        get_extractor(backend)  # 提前报告缺少的依赖
+
+    total_mb = sum(len(html.encode('utf-8')) for html, _ in pages) / 1024 / 1024
+    print(f"页面来源: {source}, {len(pages)} 个页面, {total_mb:.1f}MB")
+    print(f"后端: {', '.join(backends)}\n")
+
+    # 速度
+    found = {}
+    print(f"{'后端':<12}{'进程':>6}{'耗时(秒)':>12}{'页/秒':>10}{'MB/秒':>10}")
+    for backend in backends:
+        for workers in args.workers:
+            elapsed, results = run_backend(backend, pages, workers, args.rounds)
+            found[backend] = results
+            print(f"{backend:<12}{workers:>6}{elapsed:>12.3f}"
+                  f"{len(pages) / elapsed:>10.1f}{total_mb / elapsed:>10.2f}")
+
+    # 召回率和准确率（归档页面没有真实答案，准确率按并集计算恒为100%，不输出）
+    if truths is None:
+        union = [set().union(*(found[b][i] for b in backends)) for i in range(len(pages))]
+        union_total = sum(len(urls) for urls in union)
+        print(f"\n{'后端':<12}{'链接数':>10}{'召回率(相对并集)':>18}")
+        for backend in backends:
+            total = sum(len(urls) for urls in found[backend])
+            hits = sum(len(found[backend][i] & union[i]) for i in range(len(pages)))
+            recall = hits / union_total * 100 if union_total else 100.0
+            print(f"{backend:<12}{total:>10}{recall:>17.1f}%")
+        return 0
+
+    truth_total = sum(len(urls) for urls in truths)
+    regressions = []
+    print(f"\n{'后端':<12}{'链接数':>10}{'召回率':>10}{'准确率':>10}")
+    for backend in backends:
+        total = sum(len(urls) for urls in found[backend])
+        hits = sum(len(found[backend][i] & truths[i]) for i in range(len(pages)))
+        recall = hits / truth_total * 100 if truth_total else 100.0
+        precision = hits / total * 100 if total else 100.0
+        print(f"{backend:<12}{total:>10}{recall:>9.1f}%{precision:>9.1f}%")
+        if hits < truth_total or hits < total:
+            regressions.append(backend)
+
+    # 合成页面的每个链接都可以准确提取，任何遗漏或多余（如带上[/img]）都是回归
+    if regressions:
+        for backend in regressions:
+            wrong = [url for i in range(len(pages)) for url in sorted(found[backend][i] - truths[i])]
+            missed = [url for i in range(len(pages)) for url in sorted(truths[i] - found[backend][i])]
+            print(f"\n回归: {backend} 多余 {len(wrong)} 个, 遗漏 {len(missed)} 个")
+            for url in (wrong[:3] + missed[:3]):
+                print(f"  {url}")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+转码基准测试
+测量不同进程数下的转码吞吐（张/秒、每核张/秒）和压缩比
+图片来自指定目录；未指定时生成合成图片（大PNG和动画GIF）
+"""
+
+import os
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+from PIL import Image, ImageDraw
+
+from image_transcoder import TARGETS, Transcoder
+
+
+def synthetic_images(directory, count=40, size=(2000, 1500), seed=0):
+    """生成带渐变、噪点和色块的大PNG，以及少量动画GIF"""
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        if i % 8 == 7:
+            frames = []
+            for _ in range(10):
+                frame = Image.new('RGB', (480, 360), 'white')
+                draw = ImageDraw.Draw(frame)
+                for _ in range(30):
+                    x, y = rng.randrange(480), rng.randrange(360)
+                    color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+                    draw.rectangle([x, y, x + rng.randrange(20, 120), y + rng.randrange(20, 120)], fill=color)
+                frames.append(frame.convert('P', palette=Image.ADAPTIVE))
+            path = os.path.join(directory, f'anim_{i}.gif')
+            frames[0].save(path, save_all=True, append_images=frames[1:], duration=80, loop=0)
+        else:
+            # 渐变叠加噪点，接近照片的压缩特性
+            gradient = Image.linear_gradient('L').resize(size)
+            noise = Image.effect_noise(size, 24)
+            img = Image.merge('RGB', (gradient, Image.blend(gradient, noise, 0.3), noise))
+            draw = ImageDraw.Draw(img)
+            for _ in range(200):
+                x, y = rng.randrange(size[0]), rng.randrange(size[1])
+                color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+                draw.ellipse([x, y, x + rng.randrange(20, 300), y + rng.randrange(20, 300)], fill=color)
+            path = os.path.join(directory, f'photo_{i}.png')
+            img.save(path)
+        paths.append(path)
+    return paths
+
+
+def run_once(sources, workdir, target, quality, max_dimension, workers):
+    """复制源图片后转码，返回 (耗时, 原始总大小, 存储总大小, 失败数)"""
+    shutil.rmtree(workdir, ignore_errors=True)
+    os.makedirs(workdir)
+    paths = []
+    for source in sources:
+        path = os.path.join(workdir, os.path.basename(source))
+        shutil.copyfile(source, path)
+        paths.append(path)
+
+    transcoder = Transcoder(target=target, quality=quality, max_dimension=max_dimension, workers=workers)
+    try:
+        # 预热：进程启动时间不计入吞吐
+        list(transcoder.executor.map(abs, range(workers)))
+
+        start = time.perf_counter()
+        for path in paths:
+            transcoder.submit(path)
+        original = stored = errors = 0
+        for result in transcoder.drain():
+            original += result['original_size']
+            stored += result['stored_size']
+            errors += 1 if result['error'] else 0
+        elapsed = time.perf_counter() - start
+    finally:
+        transcoder.shutdown()
+    return elapsed, original, stored, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description='转码基准测试')
+    parser.add_argument('--input-dir', help='图片目录（默认生成合成图片）')
+    parser.add_argument('--count', type=int, default=40, help='合成图片数量')
+    parser.add_argument('--target', choices=TARGETS, default='webp', help='转码目标')
+    parser.add_argument('--quality', type=int, default=80, help='转码质量')
+    parser.add_argument('--max-dimension', type=int, default=0, help='最大边长')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1],
+                        help='进程数，可指定多个')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='transcode_bench_')
+    try:
+        if args.input_dir:
+            sources = [os.path.join(args.input_dir, name) for name in sorted(os.listdir(args.input_dir))
+                       if name.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp'))]
+            source_name = args.input_dir
+        else:
+            source_dir = os.path.join(tmp, 'source')
+            os.makedirs(source_dir)
+            sources = synthetic_images(source_dir, args.count)
+            source_name = '合成图片'
+        if not sources:
+            print("没有可用图片")
+            return
+
+        print(f"图片来源: {source_name}, {len(sources)} 张, 目标: {args.target}, "
+              f"质量: {args.quality}, 最大边长: {args.max_dimension or '不限'}\n")
+        print(f"{'进程':>6}{'耗时(秒)':>12}{'张/秒':>10}{'每核张/秒':>12}{'压缩比':>10}{'失败':>6}")
+        for workers in args.workers:
+            elapsed, original, stored, errors = run_once(
+                sources, os.path.join(tmp, 'work'), args.target, args.quality,
+                args.max_dimension, workers
+            )
+            rate = len(sources) / elapsed
+            ratio = stored / original * 100 if original else 100
+            print(f"{workers:>6}{elapsed:>12.2f}{rate:>10.1f}{rate / workers:>12.1f}{ratio:>9.1f}%{errors:>6}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
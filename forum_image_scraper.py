@@ -20,9 +20,11 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 import requests
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from page_archive import PageArchive
+
 
 class FixedIPv6Scraper:
-    def __init__(self, output_dir='./images', proxy=None, max_workers=4):
+    def __init__(self, output_dir='./images', proxy=None, max_workers=4, archive_dir=None):
         self.output_dir = output_dir
         self.proxy = proxy
         self.max_workers = max_workers
@@ -30,6 +32,11 @@ class FixedIPv6Scraper:
         # 创建输出目录
         os.makedirs(output_dir, exist_ok=True)
         
+        # 页面归档（默认为输出目录下的page_archive，''表示不归档）
+        if archive_dir is None:
+            archive_dir = os.path.join(output_dir, 'page_archive')
+        self.archive = PageArchive(archive_dir) if archive_dir else None
+        
         # 配置代理
         self.proxies = None
         if proxy:
@@ -248,6 +255,10 @@ class FixedIPv6Scraper:
                 f.write(html_content)
             print(f"页面已保存: {debug_file}")
             
+            if self.archive:
+                self.archive.append(url, html_content, status=response.status_code,
+                                    content_type=response.headers.get('Content-Type', 'text/html'))
+            
             # 2. 提取图片链接
             image_urls = self.extract_images(html_content, url)
             
@@ -313,6 +324,7 @@ def main():
     parser.add_argument('--proxy', required=True, help='代理服务器地址')
     parser.add_argument('--workers', type=int, default=4, help='并发线程数')
     parser.add_argument('--max-images', type=int, default=50, help='最大下载数量')
+    parser.add_argument('--no-archive', action='store_true', help='不归档抓取的页面')
     
     args = parser.parse_args()
     
@@ -320,7 +332,8 @@ def main():
     scraper = FixedIPv6Scraper(
         output_dir=args.output_dir,
         proxy=args.proxy,
-        max_workers=args.workers
+        max_workers=args.workers,
+        archive_dir='' if args.no_archive else None
     )
     
     # 开始抓取
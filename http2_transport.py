@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP/2图片下载通道
+同一站点的并发下载复用一条连接上的多个流，减少TCP+TLS握手和代理连接数；
+站点不支持HTTP/2时自动协商为HTTP/1.1，协议出错的站点退回requests
+需要安装: pip install 'httpx[http2]'（经SOCKS5代理时还需 'httpx[socks]'）
+"""
+
+import threading
+from urllib.parse import urlparse
+
+try:
+    import httpx
+    import h2  # noqa: F401  httpx的HTTP/2支持依赖h2
+except ImportError:
+    httpx = None
+
+# 调用方需要按网络错误处理的异常
+TRANSPORT_ERRORS = (httpx.TransportError,) if httpx is not None else ()
+
+
+# HTTP/2禁止携带的逐跳头
+HOP_BY_HOP_HEADERS = {'connection', 'keep-alive', 'proxy-connection', 'transfer-encoding', 'upgrade'}
+
+
+class Http2Response:
+    """把httpx流式响应包装成下载代码使用的requests风格接口"""
+
+    def __init__(self, response, on_close=None, on_protocol_error=None):
+        self._response = response
+        self._on_close = on_close
+        self._on_protocol_error = on_protocol_error
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.http_version = response.http_version
+
+    def iter_content(self, chunk_size=64 * 1024):
+        """逐块读取响应体；读取中途的协议错误同样让站点回退到HTTP/1.1"""
+        try:
+            yield from self._response.iter_bytes(chunk_size)
+        except httpx.ProtocolError as e:
+            if self._on_protocol_error:
+                self._on_protocol_error(e)
+            raise
+
+    def close(self):
+        self._response.close()
+        if self._on_close:
+            self._on_close()
+            self._on_close = None
+
+
+class Http2Fetcher:
+    """
+    基于httpx的HTTP/2下载客户端
+    所有下载线程共享，按站点统计请求数、HTTP/2流数和新建连接数
+    """
+
+    def __init__(self, proxy=None, timeout=15, max_connections=100):
+        """
+        Args:
+            proxy: 代理地址（与requests相同的写法）
+            timeout: 超时（秒）
+            max_connections: 连接池总连接数上限
+        """
+        if httpx is None:
+            raise RuntimeError("HTTP/2下载需要安装: pip install 'httpx[http2]'")
+
+        try:
+            self.client = httpx.Client(
+                http2=True,
+                proxy=proxy,
+                verify=False,
+                timeout=timeout,
+                limits=httpx.Limits(max_connections=max_connections),
+            )
+        except (ImportError, ValueError) as e:
+            # httpx的SOCKS支持需要socksio，且只支持socks5
+            if proxy and proxy.startswith('socks'):
+                raise RuntimeError(f"HTTP/2通道无法使用该SOCKS代理（仅支持socks5，"
+                                   f"需要 pip install 'httpx[socks]'）: {e}")
+            raise
+        # 协议出错后改用HTTP/1.1的站点
+        self.fallback_hosts = set()
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _host_stats(self, host):
+        # 调用方持有锁
+        if host not in self._stats:
+            self._stats[host] = {
+                'requests': 0,
+                'http2_streams': 0,
+                'http1_requests': 0,
+                'connections': 0,
+                'in_flight': 0,
+                'max_in_flight': 0,
+                'fallback': False,
+            }
+        return self._stats[host]
+
+    def _trace(self, host):
+        def trace(event_name, info):
+            # 每次新建TCP连接（经代理时即为到代理的连接）都会触发
+            if event_name == 'connection.connect_tcp.complete':
+                with self._lock:
+                    self._host_stats(host)['connections'] += 1
+        return trace
+
+    def _fallback(self, host, stats, error):
+        print(f"  HTTP/2协议错误，{host} 改用HTTP/1.1: {type(error).__name__}")
+        with self._lock:
+            self.fallback_hosts.add(host)
+            stats['fallback'] = True
+
+    def use_for(self, url):
+        """该站点是否走HTTP/2通道"""
+        return urlparse(url).netloc.lower() not in self.fallback_hosts
+
+    def get(self, url, headers=None):
+        """
+        流式GET请求，返回Http2Response，调用方负责close()
+        协议错误时把站点加入回退列表并返回None，由调用方改用HTTP/1.1
+        """
+        host = urlparse(url).netloc.lower()
+        headers = {k: v for k, v in (headers or {}).items() if k.lower() not in HOP_BY_HOP_HEADERS}
+
+        with self._lock:
+            stats = self._host_stats(host)
+            stats['requests'] += 1
+            stats['in_flight'] += 1
+            stats['max_in_flight'] = max(stats['max_in_flight'], stats['in_flight'])
+
+        def finished():
+            with self._lock:
+                stats['in_flight'] -= 1
+
+        try:
+            request = self.client.build_request('GET', url, headers=headers,
+                                                extensions={'trace': self._trace(host)})
+            response = self.client.send(request, stream=True)
+        except httpx.ProtocolError as e:
+            finished()
+            self._fallback(host, stats, e)
+            return None
+        except Exception:
+            finished()
+            raise
+
+        with self._lock:
+            if response.http_version == 'HTTP/2':
+                stats['http2_streams'] += 1
+            else:
+                stats['http1_requests'] += 1
+        # 读完并关闭响应后才算流结束
+        return Http2Response(response, on_close=finished,
+                             on_protocol_error=lambda e: self._fallback(host, stats, e))
+
+    def stats(self):
+        """各站点统计的副本 {站点: {...}}"""
+        with self._lock:
+            return {host: dict(stats) for host, stats in self._stats.items()}
+
+    def summary_lines(self):
+        """按站点生成统计文本"""
+        lines = []
+        for host, stats in sorted(self.stats().items(), key=lambda x: x[1]['requests'], reverse=True):
+            line = (f"{host}: 请求 {stats['requests']}, HTTP/2流 {stats['http2_streams']}, "
+                    f"HTTP/1.1 {stats['http1_requests']}, 新建连接 {stats['connections']}, "
+                    f"最大并发 {stats['max_in_flight']}")
+            if stats['fallback']:
+                line += "（已回退HTTP/1.1）"
+            lines.append(line)
+        return lines
+
+    def close(self):
+        self.client.close()
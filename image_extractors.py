@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片链接提取后端
+- regex:      正则匹配（默认，无额外依赖）
+- walker:     标准库HTMLParser逐标签遍历，识别各种懒加载属性（无额外依赖）
+- bs4:        BeautifulSoup（安装lxml时使用lxml解析器）
+- selectolax: selectolax（最快的C实现解析器，可选）
+
+所有后端都是纯函数，可在子进程中调用；extract_pages 使用进程池并行解析多个页面
+"""
+
+import os
+import re
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+
+try:
+    import lxml  # noqa: F401  仅用于判断BeautifulSoup能否使用lxml解析器
+    BS4_FEATURES = 'lxml'
+except ImportError:
+    BS4_FEATURES = 'html.parser'
+
+try:
+    from selectolax.parser import HTMLParser as SelectolaxParser
+except ImportError:
+    SelectolaxParser = None
+
+
+# 图片直链：链接本身不含[]<>，不会吞掉紧随其后的[/img]、<br>等标记；
+# 扩展名后的CDN后缀（!web、:large、&x=1等）照常保留
+IMG_URL_RE = re.compile(r'https?://[^\s"\'<>\[\]]+\.(?:jpg|jpeg|png|gif|webp|bmp)[^\s"\'<>\[\]]*',
+                        re.IGNORECASE)
+
+# img标签上可能存放真实图片地址的属性（含各种懒加载写法）
+IMG_ATTRS = ['src', 'data-src', 'ess-data', 'data-original', 'file', 'srcs', 'data-lazy-src', 'zoomfile']
+
+# 跳过缩略图、小图标和懒加载占位图
+SKIP_KEYWORDS = ['thumb', 'avatar', 'icon', 'logo', 'smiley', 'attach', 'loading', 'blank']
+
+
+def filter_image_urls(all_urls):
+    """过滤、清理并按出现顺序去重"""
+    filtered_urls = []
+    seen_urls = set()
+    
+    for url in all_urls:
+        # 清理URL（正则直接从HTML源码匹配时会带上转义的&amp;）
+        clean_url = url.split('?')[0].strip('\'"').replace('&amp;', '&')
+        
+        # 跳过base64
+        if clean_url.startswith('data:'):
+            continue
+        
+        # 跳过缩略图和小图标
+        if any(keyword in clean_url.lower() for keyword in SKIP_KEYWORDS):
+            continue
+        
+        # 确保是有效URL
+        if clean_url.startswith('http') and clean_url not in seen_urls:
+            seen_urls.add(clean_url)
+            filtered_urls.append(clean_url)
+    
+    return filtered_urls
+
+
+def extract_with_regex(html: str, base_url: str):
+    """
+    正则后端
+    针对Discuz!等论坛系统优化
+    """
+    all_urls = []
+    
+    # 1. 查找帖子内容区域
+    # Discuz!常见的内容容器
+    content_patterns = [
+        r'<div[^>]*class="[^"]*tpc_content[^"]*"[^>]*>(.*?)</div>',
+        r'<td[^>]*class="[^"]*t_f[^"]*"[^>]*>(.*?)</td>',
+        r'<div[^>]*id="postmessage_[^"]*"[^>]*>(.*?)</div>',
+        r'<div[^>]*class="[^"]*postmessage[^"]*"[^>]*>(.*?)</div>',
+        r'<div[^>]*class="[^"]*pcb[^"]*"[^>]*>(.*?)</div>',
+    ]
+    
+    # 2. 常见图床域名模式
+    hosting_domains = [
+        '66img.cc', 'qpic.ws', 'imgbox.com', 'imgur.com', 'postimg.cc',
+        'tinypic.com', 'imgbb.com', 'freeimage.host', 'imagebam.com',
+        'pixhost.org', 'imgsrc.ru', 'img.yt', 'imagevenue.com',
+        'pimpandhost.com', 'imgchili.net', 'imgtaxi.com', 'imgserve.net',
+        'imgspice.com', 'imgmoon.com', 'imgflare.com', 'imgdino.com'
+    ]
+    
+    # 3. 提取所有可能的图片链接
+    # 方法1: 正则匹配所有图片URL
+    direct_urls = IMG_URL_RE.findall(html)
+    all_urls.extend(direct_urls)
+    
+    # 方法2: 查找img标签的各种属性
+    img_tag_patterns = [
+        r'<img[^>]+src=["\']([^"\']+)["\'][^>]*>',
+        r'<img[^>]+data-src=["\']([^"\']+)["\'][^>]*>',
+        r'<img[^>]+ess-data=["\']([^"\']+)["\'][^>]*>',
+        r'<img[^>]+data-original=["\']([^"\']+)["\'][^>]*>',
+        r'<img[^>]+file=["\']([^"\']+)["\'][^>]*>',
+        r'<img[^>]+srcs=["\']([^"\']+)["\'][^>]*>',
+    ]
+    
+    for pattern in img_tag_patterns:
+        matches = re.findall(pattern, html, re.IGNORECASE)
+        for match in matches:
+            if match.startswith('http'):
+                all_urls.append(match)
+            else:
+                full_url = urljoin(base_url, match)
+                all_urls.append(full_url)
+    
+    # 方法3: 在内容区域内查找
+    for pattern in content_patterns:
+        content_matches = re.findall(pattern, html, re.IGNORECASE | re.DOTALL)
+        for content in content_matches:
+            # 在内容中查找图片链接
+            content_urls = IMG_URL_RE.findall(content)
+            all_urls.extend(content_urls)
+            
+            # 查找img标签
+            for img_pattern_tag in img_tag_patterns:
+                tag_matches = re.findall(img_pattern_tag, content, re.IGNORECASE)
+                for match in tag_matches:
+                    if match.startswith('http'):
+                        all_urls.append(match)
+                    else:
+                        full_url = urljoin(base_url, match)
+                        all_urls.append(full_url)
+    
+    return filter_image_urls(all_urls)
+
+
+def _absolute(value, base_url):
+    value = value.strip()
+    return value if value.startswith('http') else urljoin(base_url, value)
+
+
+def _collect_tag_urls(tag, attrs, base_url, urls):
+    """
+    从一个标签的属性中收集图片链接
+    img标签检查所有懒加载属性和srcset，其他属性只取图片直链
+    """
+    is_img = tag == 'img'
+    for name, value in attrs:
+        if not value:
+            continue
+        if is_img and name in IMG_ATTRS:
+            urls.append(_absolute(value, base_url))
+        elif is_img and name == 'srcset':
+            for candidate in value.split(','):
+                candidate = candidate.strip().split(' ')[0]
+                if candidate:
+                    urls.append(_absolute(candidate, base_url))
+        elif 'http' in value:
+            urls.extend(IMG_URL_RE.findall(value))
+
+
+class LazyImageWalker(HTMLParser):
+    """逐标签遍历页面，收集标签属性、文本和脚本中的图片链接"""
+
+    def __init__(self, base_url):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.urls = []
+
+    def handle_starttag(self, tag, attrs):
+        _collect_tag_urls(tag, attrs, self.base_url, self.urls)
+
+    def handle_data(self, data):
+        # 正文中的图片直链（如未解析的[img]代码、脚本中的地址）
+        if 'http' in data:
+            self.urls.extend(IMG_URL_RE.findall(data))
+
+
+def extract_with_walker(html: str, base_url: str):
+    """标准库遍历后端"""
+    walker = LazyImageWalker(base_url)
+    walker.feed(html)
+    walker.close()
+    return filter_image_urls(walker.urls)
+
+
+def extract_with_bs4(html: str, base_url: str):
+    """BeautifulSoup后端"""
+    if BeautifulSoup is None:
+        raise ImportError("bs4后端需要安装: pip install beautifulsoup4")
+    
+    soup = BeautifulSoup(html, BS4_FEATURES)
+    urls = []
+    for tag in soup.find_all(True):
+        # class等多值属性会被解析为列表
+        attrs = ((name, ' '.join(value) if isinstance(value, list) else value)
+                 for name, value in tag.attrs.items())
+        _collect_tag_urls(tag.name, attrs, base_url, urls)
+    for text in soup.find_all(string=True):
+        if 'http' in text:
+            urls.extend(IMG_URL_RE.findall(text))
+    return filter_image_urls(urls)
+
+
+def extract_with_selectolax(html: str, base_url: str):
+    """selectolax后端"""
+    if SelectolaxParser is None:
+        raise ImportError("selectolax后端需要安装: pip install selectolax")
+    
+    tree = SelectolaxParser(html)
+    urls = []
+    for node in tree.css('*'):
+        _collect_tag_urls(node.tag, node.attributes.items(), base_url, urls)
+    text = tree.root.text(separator='\n') if tree.root else ''
+    if 'http' in text:
+        urls.extend(IMG_URL_RE.findall(text))
+    return filter_image_urls(urls)
+
+
+BACKENDS = {
+    'regex': extract_with_regex,
+    'walker': extract_with_walker,
+    'bs4': extract_with_bs4,
+    'selectolax': extract_with_selectolax,
+}
+
+
+def available_backends():
+    """当前环境可用的后端"""
+    missing = set()
+    if BeautifulSoup is None:
+        missing.add('bs4')
+    if SelectolaxParser is None:
+        missing.add('selectolax')
+    return [name for name in BACKENDS if name not in missing]
+
+
+def get_extractor(backend='regex'):
+    """按名称获取提取函数，未知名称抛出ValueError，缺少依赖抛出ImportError"""
+    if backend not in BACKENDS:
+        raise ValueError(f"未知的解析后端: {backend}（可选: {', '.join(BACKENDS)}）")
+    if backend not in available_backends():
+        raise ImportError(f"解析后端 {backend} 缺少依赖")
+    return BACKENDS[backend]
+
+
+def _extract_page(args):
+    backend, html, base_url = args
+    return BACKENDS[backend](html, base_url)
+
+
+def extract_pages(pages, backend='regex', workers=None, chunksize=4):
+    """
+    多进程并行提取多个页面
+    
+    Args:
+        pages: 可迭代的 (html, base_url)，按批读取，可以是生成器
+        backend: 解析后端名称
+        workers: 进程数（默认为CPU核数，1表示在当前进程中执行）
+        chunksize: 每次发送给子进程的页面数
+    
+    Yields:
+        每个页面的图片链接列表，顺序与输入一致
+    """
+    extractor = get_extractor(backend)
+    workers = workers or os.cpu_count() or 1
+    
+    if workers == 1:
+        for html, base_url in pages:
+            yield extractor(html, base_url)
+        return
+    
+    # 分批提交：executor.map会一次取完输入，页面很多时（如整个归档）内存随之增长
+    batch_size = workers * chunksize * 4
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        batch = []
+        for html, base_url in pages:
+            batch.append((backend, html, base_url))
+            if len(batch) >= batch_size:
+                yield from executor.map(_extract_page, batch, chunksize=chunksize)
+                batch = []
+        if batch:
+            yield from executor.map(_extract_page, batch, chunksize=chunksize)
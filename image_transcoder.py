@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+下载后转码
+把下载的图片重新编码为WebP/AVIF，或在原格式下无损优化（PNG/GIF由Pillow重新压缩，
+JPEG由jpegtran优化，不解码像素），可限制最大边长（缩小尺寸时重新编码，有损）；
+转码在独立的进程池中进行，不占用下载线程
+EXIF（含方向）和ICC色彩配置随图片保留
+"""
+
+import os
+import time
+import shutil
+import threading
+import subprocess
+import multiprocessing
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from PIL import Image, ImageSequence, features
+
+try:
+    import pillow_avif  # noqa: F401  旧版Pillow通过插件支持AVIF
+except ImportError:
+    pass
+
+
+# 转码目标：webp / avif 重新编码，optimize 保持原格式做无损优化
+TARGETS = ['webp', 'avif', 'optimize']
+
+# 原格式优化时的保存参数
+# JPEG不经Pillow重新编码（有损），由jpegtran无损优化；只有缩小尺寸时才按quality重新编码
+OPTIMIZE_OPTIONS = {
+    'png': {'optimize': True},
+    'gif': {'optimize': True},
+    'jpeg': {'optimize': True, 'progressive': True},
+}
+
+# 能写入EXIF和ICC色彩配置的输出格式
+METADATA_FORMATS = {'jpeg', 'webp', 'png', 'avif'}
+
+# libjpeg-turbo的jpegtran：只重建哈夫曼表和扫描顺序，不解码像素
+JPEGTRAN = shutil.which('jpegtran')
+
+EXTENSIONS = {'webp': '.webp', 'avif': '.avif', 'png': '.png', 'gif': '.gif', 'jpeg': '.jpg'}
+
+
+def target_supported(target):
+    """当前Pillow是否支持该转码目标"""
+    if target == 'optimize':
+        return True
+    if target == 'avif':
+        return features.check('avif') or 'AVIF' in Image.SAVE
+    return features.check(target)
+
+
+def _prepare_frame(frame, target, max_dimension):
+    # ImageSequence逐帧复用同一对象，必须复制
+    if target in ('webp', 'avif') and frame.mode not in ('RGB', 'RGBA'):
+        # WebP/AVIF不支持调色板和CMYK模式
+        has_alpha = frame.mode in ('LA', 'PA') or 'transparency' in frame.info
+        frame = frame.convert('RGBA' if has_alpha else 'RGB')
+    else:
+        frame = frame.copy()
+    if max_dimension and max(frame.size) > max_dimension:
+        frame.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    return frame
+
+
+def _metadata_options(img, out_format):
+    """原图的EXIF和ICC配置，丢失EXIF方向会导致手机照片显示方向错误"""
+    if out_format not in METADATA_FORMATS:
+        return {}
+    options = {}
+    if img.info.get('exif'):
+        options['exif'] = img.info['exif']
+    # CMYK转为RGB后原ICC配置不再适用
+    if img.info.get('icc_profile') and not (img.mode == 'CMYK' and out_format != 'jpeg'):
+        options['icc_profile'] = img.info['icc_profile']
+    return options
+
+
+def _jpegtran(path):
+    """无损优化JPEG，保留全部元数据，返回优化后的数据"""
+    completed = subprocess.run(
+        [JPEGTRAN, '-copy', 'all', '-optimize', '-progressive', path],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, timeout=60
+    )
+    return completed.stdout
+
+
+def _unique_path(path):
+    counter = 1
+    name, ext = os.path.splitext(path)
+    while os.path.exists(path):
+        path = f"{name}_{counter}{ext}"
+        counter += 1
+    return path
+
+
+def _failed_result(path, error):
+    return {
+        'source': path,
+        'path': path,
+        'format': None,
+        'original_size': 0,
+        'stored_size': 0,
+        'seconds': 0.0,
+        'error': error,
+    }
+
+
+def _encode(img, target, out_format, options, max_dimension, animated, resized):
+    """用Pillow编码，返回编码后的数据"""
+    if animated:
+        frames = [_prepare_frame(frame, target, max_dimension)
+                  for frame in ImageSequence.Iterator(img)]
+        options.update({
+            'save_all': True,
+            'append_images': frames[1:],
+            'duration': img.info.get('duration', 100),
+            'loop': img.info.get('loop', 0),
+        })
+    elif target == 'optimize' and not resized:
+        # 原格式未缩放时直接保存原图对象，省去复制
+        frames = [img]
+    else:
+        frames = [_prepare_frame(img, target, max_dimension)]
+
+    buffer = BytesIO()
+    frames[0].save(buffer, format=out_format.upper(), **options)
+    return buffer.getvalue()
+
+
+def transcode_image(path, target='webp', quality=80, max_dimension=0, keep_original=False):
+    """
+    转码单个图片文件（在子进程中调用）
+    结果比原文件大且没有缩小尺寸时保留原文件
+
+    Args:
+        path: 图片路径
+        target: 'webp'、'avif' 或 'optimize'
+        quality: 有损编码质量（1-100）
+        max_dimension: 最大边长（0表示不限制）
+        keep_original: 转码后是否保留原文件
+
+    Returns:
+        dict: source, path（最终保存路径）, format, original_size, stored_size, seconds, error
+    """
+    start = time.perf_counter()
+    result = _failed_result(path, None)
+
+    try:
+        original_size = os.path.getsize(path)
+        result.update({'original_size': original_size, 'stored_size': original_size})
+        with Image.open(path) as img:
+            src_format = (img.format or '').lower()
+            resized = bool(max_dimension and max(img.size) > max_dimension)
+            animated = getattr(img, 'is_animated', False)
+
+            if target == 'optimize':
+                out_format = src_format
+                options = dict(OPTIMIZE_OPTIONS.get(src_format, {}))
+                # 缩小尺寸必须重新编码JPEG（有损）
+                if resized and src_format == 'jpeg':
+                    options['quality'] = quality
+            else:
+                out_format = target
+                options = {'quality': quality}
+                if target == 'webp':
+                    options['method'] = 4
+            result['format'] = out_format
+
+            # 原格式优化只处理能无损重新保存的格式
+            if target == 'optimize' and src_format not in OPTIMIZE_OPTIONS:
+                result['error'] = f"不支持优化的格式: {src_format}"
+                return result
+
+            if target == 'optimize' and src_format == 'jpeg' and not resized:
+                if not JPEGTRAN:
+                    result['error'] = "JPEG无损优化需要jpegtran（libjpeg-turbo），已保持原样"
+                    return result
+                data = _jpegtran(path)
+            else:
+                options.update(_metadata_options(img, out_format))
+                data = _encode(img, target, out_format, options, max_dimension, animated, resized)
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {str(e)[:100]}"
+        result['seconds'] = time.perf_counter() - start
+        return result
+
+    # 没有变小也没有缩小尺寸时不值得替换
+    if len(data) >= original_size and not resized:
+        result['seconds'] = time.perf_counter() - start
+        return result
+
+    new_path = os.path.splitext(path)[0] + EXTENSIONS[out_format]
+    if new_path != path:
+        new_path = _unique_path(new_path)
+    with open(new_path, 'wb') as f:
+        f.write(data)
+    if new_path != path and not keep_original:
+        os.remove(path)
+
+    result.update({
+        'path': new_path,
+        'stored_size': len(data),
+        'seconds': time.perf_counter() - start,
+    })
+    return result
+
+
+class Transcoder:
+    """
+    转码进程池
+    下载线程提交文件后立即返回，结果在 drain() 时按完成顺序取出
+    """
+
+    def __init__(self, target='webp', quality=80, max_dimension=0, workers=None, keep_original=False):
+        """
+        Args:
+            target: 'webp'、'avif' 或 'optimize'
+            quality: 有损编码质量
+            max_dimension: 最大边长（0表示不限制）
+            workers: 进程数（默认为CPU核数）
+            keep_original: 转码后是否保留原文件
+        """
+        if target not in TARGETS:
+            raise ValueError(f"未知的转码目标: {target}（可选: {', '.join(TARGETS)}）")
+        if not target_supported(target):
+            raise RuntimeError(f"当前Pillow不支持{target}编码")
+
+        self.target = target
+        self.quality = quality
+        self.max_dimension = max_dimension
+        self.keep_original = keep_original
+        # 下载线程运行中提交任务，使用spawn避免在多线程进程中fork
+        self.executor = ProcessPoolExecutor(max_workers=workers,
+                                            mp_context=multiprocessing.get_context('spawn'))
+        # 未取出结果的任务 {future: 路径}
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def submit(self, path):
+        """提交转码任务，不阻塞"""
+        future = self.executor.submit(transcode_image, path, self.target, self.quality,
+                                      self.max_dimension, self.keep_original)
+        with self._lock:
+            self._futures[future] = path
+        return future
+
+    def drain(self):
+        """等待已提交的任务，按完成顺序产出结果"""
+        with self._lock:
+            futures, self._futures = self._futures, {}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                # 子进程异常退出等情况
+                yield _failed_result(futures[future], f"{type(e).__name__}: {str(e)[:100]}")
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
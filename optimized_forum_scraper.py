@@ -9,17 +9,27 @@ import os
 import re
 import time
 import random
+import queue
+import json
 import hashlib
 import argparse
+import threading
 from io import BytesIO
-from urllib.parse import urljoin, urlparse, unquote
+from collections import deque
+from urllib.parse import urlparse, unquote
 
 # 完全禁用SSL警告
 import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 import requests
-from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from page_archive import PageArchive
+from proxy_usage import PERIODS as QUOTA_PERIODS, ProxyUsage, default_usage_db
+from image_extractors import BACKENDS, extract_pages, get_extractor
+from image_transcoder import TARGETS as TRANSCODE_TARGETS, Transcoder
+from http2_transport import TRANSPORT_ERRORS, Http2Fetcher
+from work_queue import KIND_IMAGE, KIND_THREAD, LeaseKeeper, default_worker_id, open_work_queue
 try:
     from PIL import Image
     from fake_useragent import UserAgent  # 用于生成随机User-Agent
@@ -29,9 +39,337 @@ except ImportError as e:
     exit(1)
 
 
+# 流水线结束标记
+_SENTINEL = object()
+
+
+class ByteBudgetTimeout(TimeoutError):
+    """等待在途字节额度超时"""
+
+
+class ByteBudgetConflict(Exception):
+    """持有额度的下载互相等待对方归还，需要放弃已读数据后重试"""
+
+
+class ByteBudget:
+    """
+    全局在途字节预算
+    所有下载线程共享，读取响应数据前先申请额度，写盘后归还
+    """
+
+    def __init__(self, max_bytes, timeout=120):
+        """
+        Args:
+            max_bytes: 在途字节上限（0表示不限制）
+            timeout: 单次等待额度的超时（秒）
+        """
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.in_flight = 0
+        # 正在等待追加额度的调用方已持有的字节数
+        self._waiting_held = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, n, held=0):
+        """
+        申请n字节额度，超出预算时阻塞等待，超时抛出ByteBudgetTimeout
+        
+        held为调用方已持有的额度（长度未知的响应边读边追加申请）。
+        其余在途额度全部属于同样在等待追加的调用方时，谁都等不到归还，
+        此时抛出ByteBudgetConflict，由调用方归还已持有的额度后重试
+        """
+        if not self.max_bytes:
+            return
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            self._waiting_held += held
+            try:
+                # 没有其他在途数据时直接放行，避免单张超大图片永久阻塞
+                while self.in_flight - held > 0 and self.in_flight + n > self.max_bytes:
+                    if held and self.in_flight <= self._waiting_held:
+                        raise ByteBudgetConflict("在途字节预算已被等待中的下载占满")
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise ByteBudgetTimeout(f"等待在途字节额度超时（{self.timeout}秒）")
+                    self._cond.wait(remaining)
+                self.in_flight += n
+            finally:
+                self._waiting_held -= held
+                # 等待者集合变化后让其他等待者重新判断是否互相卡住
+                self._cond.notify_all()
+
+    def release(self, n):
+        """归还n字节额度"""
+        if not self.max_bytes or not n:
+            return
+        with self._cond:
+            self.in_flight = max(0, self.in_flight - n)
+            self._cond.notify_all()
+
+
+class TokenBucket:
+    """
+    令牌桶限速（字节/秒）
+    多线程共享，允许短时透支，透支部分按速率睡眠补足，长期平均速率不超过rate
+    """
+
+    def __init__(self, rate, burst=None):
+        """
+        Args:
+            rate: 速率（字节/秒，0表示不限速）
+            burst: 桶容量（默认为1秒的量）
+        """
+        self.rate = rate
+        self.capacity = burst or rate
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, n):
+        """消耗n字节令牌，不足时阻塞"""
+        if not self.rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            self.tokens -= n
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+# 按代理共享的令牌桶，同一进程内使用同一代理的抓取器共用额度
+_proxy_buckets = {}
+_proxy_buckets_lock = threading.Lock()
+
+
+def get_proxy_bucket(proxy, rate):
+    """获取代理对应的令牌桶，首次创建时的速率生效"""
+    with _proxy_buckets_lock:
+        if proxy not in _proxy_buckets:
+            _proxy_buckets[proxy] = TokenBucket(rate)
+        return _proxy_buckets[proxy]
+
+
+class ThroughputMeter:
+    """
+    吞吐统计
+    记录已下载字节数，按滑动窗口计算速率，并跟踪流量配额
+    """
+
+    def __init__(self, quota_bytes=0, window=10, usage=None):
+        """
+        Args:
+            quota_bytes: 流量配额（0表示不限制）
+            window: 计算速率的滑动窗口（秒）
+            usage: 共享流量记录（proxy_usage.ProxyUsage），设置后配额按其跨进程、跨运行的累计用量计算，
+                   否则只按本次运行的下载量计算
+        """
+        self.quota_bytes = quota_bytes
+        self.usage = usage
+        self.window = window
+        self.total_bytes = 0
+        self.started = time.monotonic()
+        self._samples = deque()
+        self._lock = threading.Lock()
+
+    def add(self, n):
+        now = time.monotonic()
+        with self._lock:
+            self.total_bytes += n
+            self._samples.append((now, n))
+            while self._samples and self._samples[0][0] < now - self.window:
+                self._samples.popleft()
+
+    def rate(self):
+        """最近窗口内的速率（字节/秒）"""
+        now = time.monotonic()
+        with self._lock:
+            recent = sum(n for t, n in self._samples if t >= now - self.window)
+        # 刚启动时按至少1秒计算，避免速率虚高
+        return recent / min(self.window, max(now - self.started, 1.0))
+
+    def quota_remaining(self):
+        """剩余配额（字节），不限制时返回None"""
+        if not self.quota_bytes:
+            return None
+        used = self.usage.used() if self.usage else self.total_bytes
+        return max(0, self.quota_bytes - used)
+
+    def quota_exhausted(self):
+        remaining = self.quota_remaining()
+        return remaining is not None and remaining <= 0
+
+    def status_line(self, completed=0, total=None, started=None):
+        """生成状态行：速率、已下载量、进度、预计剩余时间、剩余配额"""
+        mb = 1024 * 1024
+        parts = [f"速率 {self.rate() / mb:.2f}MB/s", f"已下载 {self.total_bytes / mb:.1f}MB"]
+        if total:
+            parts.append(f"进度 {completed}/{total}")
+            elapsed = time.monotonic() - (started or self.started)
+            if completed and elapsed > 0:
+                eta = (total - completed) * elapsed / completed
+                parts.append(f"预计剩余 {int(eta) // 60}分{int(eta) % 60:02d}秒")
+        remaining = self.quota_remaining()
+        if remaining is not None:
+            parts.append(f"配额剩余 {remaining / mb:.1f}MB")
+        return ' | '.join(parts)
+
+
+class HostScheduler:
+    """
+    按站点公平调度的待下载队列
+    每个站点一个子队列，工作线程取任务时在站点间轮转，
+    避免某个慢站点占满所有线程；接口与queue.Queue的put/get一致
+    """
+
+    def __init__(self, maxsize, per_host_limit=0, host_limits=None,
+                 host_stats=None, prefer_reliable=False, max_weight=3):
+        """
+        Args:
+            maxsize: 排队任务总数上限（背压）
+            per_host_limit: 默认单站点同时下载数上限（0表示不限制）
+            host_limits: 指定站点的上限，如 {'imgbox.com': 2}
+            host_stats: 站点历史成功统计 {站点: [成功数, 总数]}，可跨多次抓取共享
+            prefer_reliable: 是否让历史成功率高的站点获得更多调度份额
+            max_weight: 成功率100%时每轮可连续调度的任务数
+        """
+        self.maxsize = maxsize
+        # 排队任务都被站点上限挡住时允许预读，但不超过此硬上限
+        self.hard_limit = maxsize * 4
+        self.per_host_limit = per_host_limit
+        self.host_limits = host_limits or {}
+        self.host_stats = host_stats if host_stats is not None else {}
+        self.prefer_reliable = prefer_reliable
+        self.max_weight = max_weight
+        
+        self._queues = {}
+        self._order = deque()
+        self._in_flight = {}
+        self._credits = {}
+        self._queued = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @staticmethod
+    def host_of(url):
+        """提取站点名"""
+        try:
+            return urlparse(url).netloc.lower()
+        except Exception:
+            return ''
+
+    def host_limit(self, host):
+        """站点同时下载数上限（0表示不限制）"""
+        return self.host_limits.get(host, self.per_host_limit)
+
+    def weight(self, host):
+        """站点每轮可连续调度的任务数"""
+        if not self.prefer_reliable:
+            return 1
+        success, total = self.host_stats.get(host, (0, 0))
+        # 拉普拉斯平滑，新站点按50%处理
+        rate = (success + 1) / (total + 2)
+        return 1 + round(rate * (self.max_weight - 1))
+
+    def _dispatchable(self, host):
+        limit = self.host_limit(host)
+        return bool(self._queues.get(host)) and (not limit or self._in_flight.get(host, 0) < limit)
+
+    def _is_full(self):
+        if self._queued >= self.hard_limit:
+            return True
+        # 排队任务中还有可调度的，才对生产者施加背压
+        return self._queued >= self.maxsize and any(self._dispatchable(h) for h in self._order)
+
+    def _next_item(self):
+        # 从当前站点开始轮转，找到第一个未达上限的站点
+        for _ in range(len(self._order)):
+            host = self._order[0]
+            if not self._dispatchable(host):
+                self._order.rotate(-1)
+                self._credits.pop(host, None)
+                continue
+            
+            item = self._queues[host].popleft()
+            self._queued -= 1
+            self._in_flight[host] = self._in_flight.get(host, 0) + 1
+            
+            credits = self._credits.get(host, self.weight(host)) - 1
+            if not self._queues[host]:
+                self._order.popleft()
+                del self._queues[host]
+                self._credits.pop(host, None)
+            elif credits <= 0:
+                self._order.rotate(-1)
+                self._credits.pop(host, None)
+            else:
+                self._credits[host] = credits
+            return item
+        return None
+
+    def put(self, item, timeout=None):
+        """
+        加入待下载链接（或首个元素为链接的元组），
+        队列满时阻塞，超时抛出queue.Full
+        """
+        host = self.host_of(item[0] if isinstance(item, tuple) else item)
+        with self._cond:
+            if not self._cond.wait_for(lambda: not self._is_full(), timeout):
+                raise queue.Full
+            if host not in self._queues:
+                self._queues[host] = deque()
+                self._order.append(host)
+            self._queues[host].append(item)
+            self._queued += 1
+            self._cond.notify_all()
+
+    def get(self, timeout=None):
+        """
+        取出下一个任务，暂无可调度任务时阻塞，超时抛出queue.Empty
+        已关闭且全部取完时返回结束标记
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                item = self._next_item()
+                if item is not None:
+                    self._cond.notify_all()
+                    return item
+                if self._closed and not self._queued:
+                    return _SENTINEL
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise queue.Empty
+                self._cond.wait(remaining)
+
+    def task_done(self, url, success):
+        """下载结束后释放站点名额并记录成功率，success为None表示未下载（不计入统计）"""
+        host = self.host_of(url)
+        with self._cond:
+            self._in_flight[host] = max(0, self._in_flight.get(host, 0) - 1)
+            if success is not None:
+                stats = self.host_stats.setdefault(host, [0, 0])
+                stats[0] += 1 if success else 0
+                stats[1] += 1
+            self._cond.notify_all()
+
+    def close(self):
+        """不再加入新链接"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
 class OptimizedForumScraper:
     def __init__(self, output_dir='./forum_images', min_width=600, min_height=600,
-                 max_workers=6, delay_range=(1, 3), proxy=None, use_cookies=False):
+                 max_workers=6, delay_range=(1, 3), proxy=None, use_cookies=False,
+                 max_images=50, queue_size=None, max_inflight_bytes=64 * 1024 * 1024,
+                 per_host_limit=0, host_limits=None, prefer_reliable_hosts=False,
+                 archive_dir=None, parser_backend='regex',
+                 max_bandwidth=0, proxy_bandwidth=0, quota_bytes=0, status_interval=10,
+                 usage_db=None, quota_period='month', transcoder=None, http2=False):
         """
         初始化爬虫
         
@@ -43,6 +381,23 @@ class OptimizedForumScraper:
             delay_range: 延迟范围（秒）
             proxy: 代理服务器
             use_cookies: 是否使用cookies
+            max_images: 每个页面最大下载数量（0表示不限制）
+            queue_size: 待下载队列长度（默认为工作线程数的2倍）
+            max_inflight_bytes: 所有线程在途字节总上限（0表示不限制）
+            per_host_limit: 单站点同时下载数上限（0表示不限制）
+            host_limits: 指定站点的同时下载数上限，如 {'imgbox.com': 2}
+            prefer_reliable_hosts: 历史成功率高的站点优先调度
+            archive_dir: 页面归档目录（默认为输出目录下的page_archive，''表示不归档）
+            parser_backend: 图片链接解析后端（regex/walker/bs4/selectolax）
+            max_bandwidth: 全局下载带宽上限（字节/秒，0表示不限速）
+            proxy_bandwidth: 单个代理带宽上限（字节/秒，同一代理的抓取器共享）
+            quota_bytes: 流量配额（字节），用完后不再开始新的下载
+            status_interval: 状态行输出间隔（秒，0表示不输出）
+            usage_db: 代理流量记录文件，设置后代理带宽上限由本机所有进程共享，
+                      配额按周期跨进程、跨运行累计（None表示只在本进程内统计）
+            quota_period: 配额周期 'month'、'day' 或 'total'
+            transcoder: 下载后转码（image_transcoder.Transcoder，None表示不转码）
+            http2: 图片下载使用HTTP/2多路复用（需要httpx[http2]）
         """
         self.output_dir = output_dir
         self.min_width = min_width
@@ -51,10 +406,44 @@ class OptimizedForumScraper:
         self.delay_range = delay_range
         self.proxy = proxy
         self.use_cookies = use_cookies
+        self.parser_backend = parser_backend
+        self.extractor = get_extractor(parser_backend)
+        self.max_images = max_images
+        self.queue_size = queue_size or max_workers * 2
+        
+        # 在途字节预算（所有下载线程共享）
+        self.byte_budget = ByteBudget(max_inflight_bytes)
+        
+        # 带宽限速与吞吐统计（所有下载线程共享）
+        self.bandwidth = TokenBucket(max_bandwidth)
+        self.proxy_bandwidth = None
+        self.proxy_usage = None
+        if usage_db and (proxy_bandwidth or quota_bytes):
+            # 按代理记录在文件中，同一代理的所有进程共用带宽和配额
+            self.proxy_usage = ProxyUsage(usage_db, proxy or 'direct', rate=proxy_bandwidth if proxy else 0,
+                                          period=quota_period)
+        elif proxy and proxy_bandwidth:
+            self.proxy_bandwidth = get_proxy_bucket(proxy, proxy_bandwidth)
+        self.meter = ThroughputMeter(quota_bytes, usage=self.proxy_usage)
+        self.status_interval = status_interval
+        
+        # 下载后转码，在独立进程池中进行
+        self.transcoder = transcoder
+        
+        # 站点调度配置，成功率统计跨多次抓取保留
+        self.per_host_limit = per_host_limit
+        self.host_limits = host_limits or {}
+        self.prefer_reliable_hosts = prefer_reliable_hosts
+        self.host_stats = {}
         
         # 创建输出目录
         os.makedirs(output_dir, exist_ok=True)
         
+        # 页面归档（保留每次抓取的原始页面，供离线重新提取）
+        if archive_dir is None:
+            archive_dir = os.path.join(output_dir, 'page_archive')
+        self.archive = PageArchive(archive_dir) if archive_dir else None
+        
         # 初始化User-Agent生成器
         try:
             self.ua = UserAgent()
@@ -81,6 +470,15 @@ class OptimizedForumScraper:
             else:
                 self.proxies = {'http': f'http://{proxy}', 'https': f'http://{proxy}'}
         
+        # HTTP/2图片下载通道（同站点并发下载复用一条连接）
+        self.http2 = None
+        if http2:
+            proxy_url = self.proxies['https'] if self.proxies else None
+            try:
+                self.http2 = Http2Fetcher(proxy=proxy_url)
+            except RuntimeError as e:
+                print(f"未启用HTTP/2，图片下载使用HTTP/1.1: {e}")
+        
         # 配置Cookies（如果需要）
         if use_cookies:
             # 这里可以加载预配置的cookies
@@ -138,93 +536,9 @@ class OptimizedForumScraper:
         """
         print("正在分析页面结构...")
         
-        all_urls = []
-        
-        # 1. 查找帖子内容区域
-        # Discuz!常见的内容容器
-        content_patterns = [
-            r'<div[^>]*class="[^"]*tpc_content[^"]*"[^>]*>(.*?)</div>',
-            r'<td[^>]*class="[^"]*t_f[^"]*"[^>]*>(.*?)</td>',
-            r'<div[^>]*id="postmessage_[^"]*"[^>]*>(.*?)</div>',
-            r'<div[^>]*class="[^"]*postmessage[^"]*"[^>]*>(.*?)</div>',
-            r'<div[^>]*class="[^"]*pcb[^"]*"[^>]*>(.*?)</div>',
-        ]
-        
-        # 2. 常见图床域名模式
-        hosting_domains = [
-            '66img.cc', 'qpic.ws', 'imgbox.com', 'imgur.com', 'postimg.cc',
-            'tinypic.com', 'imgbb.com', 'freeimage.host', 'imagebam.com',
-            'pixhost.org', 'imgsrc.ru', 'img.yt', 'imagevenue.com',
-            'pimpandhost.com', 'imgchili.net', 'imgtaxi.com', 'imgserve.net',
-            'imgspice.com', 'imgmoon.com', 'imgflare.com', 'imgdino.com'
-        ]
-        
-        # 3. 提取所有可能的图片链接
-        # 方法1: 正则匹配所有图片URL
-        img_pattern = r'https?://[^\s"\']+\.(?:jpg|jpeg|png|gif|webp|bmp)[^\s"\']*'
-        direct_urls = re.findall(img_pattern, html, re.IGNORECASE)
-        all_urls.extend(direct_urls)
-        
-        # 方法2: 查找img标签的各种属性
-        img_tag_patterns = [
-            r'<img[^>]+src=["\']([^"\']+)["\'][^>]*>',
-            r'<img[^>]+data-src=["\']([^"\']+)["\'][^>]*>',
-            r'<img[^>]+ess-data=["\']([^"\']+)["\'][^>]*>',
-            r'<img[^>]+data-original=["\']([^"\']+)["\'][^>]*>',
-            r'<img[^>]+file=["\']([^"\']+)["\'][^>]*>',
-            r'<img[^>]+srcs=["\']([^"\']+)["\'][^>]*>',
-        ]
-        
-        for pattern in img_tag_patterns:
-            matches = re.findall(pattern, html, re.IGNORECASE)
-            for match in matches:
-                if match.startswith('http'):
-                    all_urls.append(match)
-                else:
-                    full_url = urljoin(base_url, match)
-                    all_urls.append(full_url)
-        
-        # 方法3: 在内容区域内查找
-        for pattern in content_patterns:
-            content_matches = re.findall(pattern, html, re.IGNORECASE | re.DOTALL)
-            for content in content_matches:
-                # 在内容中查找图片链接
-                content_urls = re.findall(img_pattern, content, re.IGNORECASE)
-                all_urls.extend(content_urls)
-                
-                # 查找img标签
-                for img_pattern_tag in img_tag_patterns:
-                    tag_matches = re.findall(img_pattern_tag, content, re.IGNORECASE)
-                    for match in tag_matches:
-                        if match.startswith('http'):
-                            all_urls.append(match)
-                        else:
-                            full_url = urljoin(base_url, match)
-                            all_urls.append(full_url)
-        
-        # 4. 过滤和清理
-        filtered_urls = []
-        seen_urls = set()
-        
-        for url in all_urls:
-            # 清理URL
-            clean_url = url.split('?')[0].strip('\'"')
-            
-            # 跳过base64
-            if clean_url.startswith('data:'):
-                continue
-            
-            # 跳过缩略图和小图标
-            skip_keywords = ['thumb', 'avatar', 'icon', 'logo', 'smiley', 'attach']
-            if any(keyword in clean_url.lower() for keyword in skip_keywords):
-                continue
-            
-            # 确保是有效URL
-            if clean_url.startswith('http') and clean_url not in seen_urls:
-                seen_urls.add(clean_url)
-                filtered_urls.append(clean_url)
+        filtered_urls = self.extractor(html, base_url)
         
-        # 5. 按域名分组统计
+        # 按域名分组统计
         domain_count = {}
         for url in filtered_urls:
             try:
@@ -242,9 +556,82 @@ class OptimizedForumScraper:
         
         return filtered_urls
     
+    def account_bytes(self, n):
+        """记录下载的字节数：全局和代理两级限速、吞吐统计、代理流量记录"""
+        self.bandwidth.consume(n)
+        if self.proxy_usage:
+            self.proxy_usage.consume(n)
+        elif self.proxy_bandwidth:
+            self.proxy_bandwidth.consume(n)
+        self.meter.add(n)
+    
+    def read_response_body(self, response, chunk_size=64 * 1024):
+        """
+        按块读取响应体
+        读取前向全局预算申请额度，读取时按带宽上限限速，
+        返回 (数据, 已申请字节数)，由调用方负责归还额度
+        """
+        chunks = []
+        reserved = 0
+        received = 0
+        
+        # 已知长度时一次性申请，避免读到一半才被阻塞
+        content_length = response.headers.get('Content-Length', '')
+        if content_length.isdigit():
+            reserved = int(content_length)
+            self.byte_budget.acquire(reserved)
+        
+        try:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                if not chunk:
+                    continue
+                received += len(chunk)
+                self.account_bytes(len(chunk))
+                # 长度未知或超出声明长度时按块追加申请
+                if received > reserved:
+                    extra = received - reserved
+                    self.byte_budget.acquire(extra, held=reserved)
+                    reserved += extra
+                chunks.append(chunk)
+        except TRANSPORT_ERRORS as e:
+            # HTTP/2读取响应体时的超时、协议错误，同样按网络错误重试
+            self.byte_budget.release(reserved)
+            raise requests.exceptions.ConnectionError(f"{type(e).__name__}: {e}")
+        except Exception:
+            self.byte_budget.release(reserved)
+            raise
+        
+        return b''.join(chunks), reserved
+    
+    def fetch_image(self, url: str, headers):
+        """
+        发送图片请求（流式）
+        启用HTTP/2时优先走HTTP/2通道，协议出错的站点回退到requests
+        """
+        if self.http2 and self.http2.use_for(url):
+            try:
+                response = self.http2.get(url, headers)
+            except TRANSPORT_ERRORS as e:
+                # 转换为requests异常，沿用网络错误的重试逻辑
+                raise requests.exceptions.ConnectionError(f"{type(e).__name__}: {e}")
+            if response is not None:
+                return response
+        
+        return self.session.get(
+            url, 
+            headers=headers,
+            timeout=15,
+            stream=True,
+            proxies=self.proxies,
+            verify=False  # 禁用SSL验证
+        )
+    
     def download_image_with_retry(self, url: str, referer: str, max_retries=3):
         """带重试机制的图片下载"""
+        saved = None
         for attempt in range(max_retries):
+            reserved = 0
+            response = None
             try:
                 # 随机延迟
                 self.random_delay()
@@ -263,14 +650,7 @@ class OptimizedForumScraper:
                 })
                 
                 # 发送请求
-                response = self.session.get(
-                    url, 
-                    headers=headers,
-                    timeout=15,
-                    stream=True,
-                    proxies=self.proxies,
-                    verify=False  # 禁用SSL验证
-                )
+                response = self.fetch_image(url, headers)
                 
                 if response.status_code != 200:
                     print(f"  失败: 状态码 {response.status_code}")
@@ -286,8 +666,8 @@ class OptimizedForumScraper:
                     print(f"  失败: 非图片内容")
                     continue
                 
-                # 读取数据
-                img_data = response.content
+                # 读取数据（受全局在途字节预算约束）
+                img_data, reserved = self.read_response_body(response)
                 
                 if len(img_data) < 4096:  # 小于4KB的可能不是有效图片
                     print(f"  失败: 文件太小 ({len(img_data)} bytes)")
@@ -349,8 +729,20 @@ class OptimizedForumScraper:
                 
                 file_size_kb = len(img_data) // 1024
                 print(f"  成功: {filename} ({width}x{height}, {file_size_kb}KB)")
-                return filepath
                 
+                saved = filepath
+                break
+                
+            except ByteBudgetTimeout as e:
+                # 其他下载长时间占满预算，放弃本张，不拖住流水线
+                print(f"  失败: {e}")
+                return None
+            except ByteBudgetConflict as e:
+                # 已读数据的额度已在read_response_body中归还，稍后重新下载
+                print(f"  预算不足: {e}")
+                if attempt < max_retries - 1:
+                    time.sleep(random.uniform(1, 3))
+                    continue
             except requests.exceptions.RequestException as e:
                 print(f"  网络错误: {type(e).__name__}")
                 if attempt < max_retries - 1:
@@ -362,11 +754,197 @@ class OptimizedForumScraper:
                 if attempt < max_retries - 1:
                     time.sleep(2)
                     continue
+            finally:
+                # 写盘或失败后归还在途字节额度，并释放连接（HTTP/2流）
+                self.byte_budget.release(reserved)
+                if response is not None:
+                    response.close()
         
-        return None
+        # 提交转码后立即返回，不阻塞下载线程；
+        # 不放在重试范围内，进程池损坏等错误只记录，不会重新下载已保存的图片
+        if saved and self.transcoder:
+            try:
+                self.transcoder.submit(saved)
+            except Exception as e:
+                print(f"  提交转码失败: {type(e).__name__}: {str(e)[:100]}")
+        
+        return saved
+    
+    def iter_downloads(self, image_urls, referer: str, max_images=None, total=None):
+        """
+        有界流水线下载
+        生产者线程把链接逐个放入按站点调度的有界队列，队列满时阻塞形成背压；
+        工作线程在站点间轮转取任务，每完成一张就产出一张，内存占用与链接总数无关
+        
+        Args:
+            image_urls: 图片链接的可迭代对象（可以是生成器），
+                        元素也可以是 (图片链接, 来源页面)
+            referer: 默认来源页面
+            max_images: 最大下载数量（默认使用self.max_images，0表示不限制）
+            total: 预计任务总数，用于状态行显示进度和剩余时间
+        
+        Yields:
+            (图片链接, 文件路径)，下载失败时文件路径为None；
+            流量配额用完后仍在排队的链接不下载，也不产出
+        """
+        task_queue = HostScheduler(
+            self.queue_size,
+            per_host_limit=self.per_host_limit,
+            host_limits=self.host_limits,
+            host_stats=self.host_stats,
+            prefer_reliable=self.prefer_reliable_hosts
+        )
+        result_queue = queue.Queue(maxsize=self.queue_size)
+        stop_event = threading.Event()
+        if max_images is None:
+            max_images = self.max_images
+        
+        def put_until_stopped(q, item):
+            # 带超时的阻塞写入，消费方提前退出时不会永久卡住
+            while not stop_event.is_set():
+                try:
+                    q.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def producer():
+            try:
+                for index, task in enumerate(image_urls):
+                    if max_images and index >= max_images:
+                        break
+                    if self.meter.quota_exhausted():
+                        print("流量配额已用完，停止加入新任务")
+                        break
+                    if not isinstance(task, tuple):
+                        task = (task, referer)
+                    if not put_until_stopped(task_queue, task):
+                        return
+            except Exception as e:
+                print(f"链接生成出错: {e}")
+            finally:
+                task_queue.close()
+        
+        def worker():
+            while not stop_event.is_set():
+                try:
+                    task = task_queue.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if task is _SENTINEL:
+                    break
+                img_url, img_referer = task
+                # 已排队的任务也要检查配额，生产者停止时队列里可能还有很多任务
+                if self.meter.quota_exhausted():
+                    task_queue.task_done(img_url, None)
+                    continue
+                try:
+                    result = self.download_image_with_retry(img_url, img_referer)
+                except Exception as e:
+                    print(f"下载出错 {img_url}: {e}")
+                    result = None
+                task_queue.task_done(img_url, result is not None)
+                put_until_stopped(result_queue, (img_url, result))
+            put_until_stopped(result_queue, _SENTINEL)
+        
+        completed = 0
+        started = time.monotonic()
+        
+        def reporter():
+            # 定期输出状态行
+            while not stop_event.wait(self.status_interval):
+                print(f"[状态] {self.meter.status_line(completed, total, started)}")
+        
+        threads = [threading.Thread(target=producer, name='producer', daemon=True)]
+        if self.status_interval:
+            threads.append(threading.Thread(target=reporter, name='reporter', daemon=True))
+        threads += [
+            threading.Thread(target=worker, name=f'worker-{i}', daemon=True)
+            for i in range(self.max_workers)
+        ]
+        for thread in threads:
+            thread.start()
+        
+        try:
+            finished = 0
+            while finished < self.max_workers:
+                item = result_queue.get()
+                if item is _SENTINEL:
+                    finished += 1
+                    continue
+                completed += 1
+                yield item
+        finally:
+            # 正常结束或调用方提前退出，都通知所有线程停止
+            stop_event.set()
+            for thread in threads:
+                thread.join()
+    
+    def write_transcode_report(self, f):
+        """等待转码完成，把原始大小和存储大小写入报告"""
+        print("等待转码完成...")
+        count = original_total = stored_total = 0
+        f.write("\n转码结果（原始大小 -> 存储大小）:\n")
+        for result in self.transcoder.drain():
+            count += 1
+            original_total += result['original_size']
+            stored_total += result['stored_size']
+            line = (f"{os.path.basename(result['source'])} -> {os.path.basename(result['path'])}: "
+                    f"{result['original_size'] // 1024}KB -> {result['stored_size'] // 1024}KB")
+            if result['error']:
+                line += f"（失败: {result['error']}）"
+            f.write(line + "\n")
+        
+        mb = 1024 * 1024
+        ratio = stored_total / original_total * 100 if original_total else 100
+        summary = f"转码 {count} 个文件: {original_total / mb:.1f}MB -> {stored_total / mb:.1f}MB ({ratio:.1f}%)"
+        f.write(summary + "\n")
+        print(summary)
+    
+    def fetch_page(self, url: str):
+        """获取帖子页面，保存调试文件并归档，失败返回None"""
+        print("正在获取页面内容...")
+        headers = self.get_random_headers()
+        
+        self.random_delay()  # 初始延迟
+        
+        response = self.session.get(
+            url, 
+            headers=headers,
+            timeout=30,
+            proxies=self.proxies,
+            verify=False
+        )
+        
+        if response.status_code != 200:
+            print(f"无法访问页面: 状态码 {response.status_code}")
+            print(f"响应头: {dict(response.headers)}")
+            return None
+        
+        response.encoding = 'utf-8'
+        html_content = response.text
+        # 页面同样计入带宽上限和流量配额
+        self.account_bytes(len(response.content))
+        
+        # 保存HTML用于调试
+        debug_file = os.path.join(self.output_dir, 'page_debug.html')
+        with open(debug_file, 'w', encoding='utf-8') as f:
+            f.write(html_content)
+        print(f"页面已保存到: {debug_file}")
+        
+        if self.archive:
+            self.archive.append(url, html_content, status=response.status_code,
+                                content_type=response.headers.get('Content-Type', 'text/html'))
+            print(f"页面已归档到: {self.archive.archive_dir}")
+        
+        return html_content
     
     def scrape(self, url: str):
-        """主抓取函数"""
+        """
+        主抓取函数
+        下载结果不在内存中累积，逐个写入报告文件，返回成功下载数量
+        """
         print(f"开始抓取: {url}")
         
         if self.proxy:
@@ -377,107 +955,304 @@ class OptimizedForumScraper:
         
         try:
             # 1. 获取页面
-            print("正在获取页面内容...")
-            headers = self.get_random_headers()
-            
-            self.random_delay()  # 初始延迟
-            
-            response = self.session.get(
-                url, 
-                headers=headers,
-                timeout=30,
-                proxies=self.proxies,
-                verify=False
-            )
-            
-            if response.status_code != 200:
-                print(f"无法访问页面: 状态码 {response.status_code}")
-                print(f"响应头: {dict(response.headers)}")
-                return []
-            
-            response.encoding = 'utf-8'
-            html_content = response.text
-            
-            # 保存HTML用于调试
-            debug_file = os.path.join(self.output_dir, 'page_debug.html')
-            with open(debug_file, 'w', encoding='utf-8') as f:
-                f.write(html_content)
-            print(f"页面已保存到: {debug_file}")
+            html_content = self.fetch_page(url)
+            if html_content is None:
+                return 0
             
             # 2. 提取图片链接
             image_urls = self.extract_forum_images(html_content, url)
             
             if not image_urls:
                 print("未找到图片链接")
-                return []
+                return 0
             
-            # 3. 并发下载
-            downloaded_files = []
-            print(f"\n开始下载 {len(image_urls)} 张图片...")
+            # 3. 流水线下载，结果边完成边写入报告
+            download_count = len(image_urls)
+            if self.max_images:
+                download_count = min(download_count, self.max_images)
+            print(f"\n开始下载 {download_count} 张图片...")
             
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                future_to_url = {
-                    executor.submit(self.download_image_with_retry, img_url, url): img_url 
-                    for img_url in image_urls[:50]  # 限制最多50张
-                }
-                
-                completed = 0
-                for future in as_completed(future_to_url):
-                    completed += 1
-                    img_url = future_to_url[future]
-                    try:
-                        result = future.result(timeout=60)
-                        if result:
-                            downloaded_files.append(result)
-                    except Exception as e:
-                        print(f"下载出错 {img_url}: {e}")
-                    
-                    # 进度显示
-                    if completed % 5 == 0:
-                        print(f"进度: {completed}/{len(future_to_url)}")
-            
-            # 4. 生成报告
+            completed = 0
+            success = 0
             report_file = os.path.join(self.output_dir, 'download_report.txt')
             with open(report_file, 'w', encoding='utf-8') as f:
                 f.write(f"抓取报告 - {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
                 f.write(f"目标URL: {url}\n")
                 f.write(f"找到链接: {len(image_urls)}\n")
-                f.write(f"成功下载: {len(downloaded_files)}\n")
-                f.write(f"成功率: {len(downloaded_files)/len(image_urls)*100:.1f}%\n\n")
+                f.write(f"尝试下载: {download_count}\n\n")
                 f.write("下载的文件:\n")
-                for i, filepath in enumerate(downloaded_files, 1):
-                    f.write(f"{i}. {os.path.basename(filepath)}\n")
+                
+                for img_url, result in self.iter_downloads(image_urls, url, total=download_count):
+                    completed += 1
+                    if result:
+                        success += 1
+                        f.write(f"{success}. {os.path.basename(result)}\n")
+                        f.flush()
+                    
+                    # 进度显示
+                    if completed % 5 == 0:
+                        print(f"进度: {completed}/{download_count}")
+                
+                success_rate = success / download_count * 100 if download_count else 0
+                f.write(f"\n成功下载: {success}\n")
+                f.write(f"成功率: {success_rate:.1f}%\n")
+                
+                if self.transcoder:
+                    self.write_transcode_report(f)
+                
+                if self.http2:
+                    f.write("\nHTTP/2连接统计:\n")
+                    for line in self.http2.summary_lines():
+                        f.write(line + "\n")
             
             print(f"\n抓取完成!")
-            print(f"成功下载 {len(downloaded_files)}/{len(image_urls)} 张图片")
-            print(f"成功率: {len(downloaded_files)/len(image_urls)*100:.1f}%")
+            print(f"成功下载 {success}/{download_count} 张图片")
+            print(f"成功率: {success_rate:.1f}%")
+            print(f"[状态] {self.meter.status_line()}")
+            if self.http2:
+                print("HTTP/2连接统计:")
+                for line in self.http2.summary_lines():
+                    print(f"  {line}")
             print(f"报告已保存到: {report_file}")
             
-            return downloaded_files
+            return success
             
         except Exception as e:
             print(f"抓取失败: {e}")
             import traceback
             traceback.print_exc()
-            return []
+            return 0
+
+    
+    def _expand_thread(self, work_queue, item, worker_id):
+        """处理一个帖子任务：获取页面、提取图片链接并加入共享队列"""
+        try:
+            html_content = self.fetch_page(item.url)
+        except requests.exceptions.RequestException as e:
+            print(f"获取页面失败: {type(e).__name__}")
+            html_content = None
+        if html_content is None:
+            work_queue.nack(item.id, worker_id, '页面获取失败')
+            return
+        
+        image_urls = self.extract_forum_images(html_content, item.url)
+        if self.max_images:
+            image_urls = image_urls[:self.max_images]
+        added = work_queue.put_many(KIND_IMAGE, [(img_url, {'referer': item.url}) for img_url in image_urls])
+        work_queue.ack(item.id, worker_id, {'images': len(image_urls), 'added': added})
+        print(f"帖子已展开: {item.url}（新增 {added} 个图片任务）")
+    
+    def run_worker(self, work_queue, worker_id=None, lease_seconds=120, poll_interval=5):
+        """
+        分布式工作节点
+        从共享队列领取图片任务送入本地流水线；没有图片任务时领取帖子任务并展开。
+        持有的租约由后台线程续约，节点崩溃后租约过期，任务自动回到队列
+        
+        Args:
+            work_queue: 共享工作队列（WorkQueue）
+            worker_id: 节点标识（默认 主机名-进程号）
+            lease_seconds: 租约时长（秒）
+            poll_interval: 队列暂时为空时的轮询间隔（秒）
+        
+        Returns:
+            本节点成功下载数量
+        """
+        worker_id = worker_id or default_worker_id()
+        print(f"工作节点 {worker_id} 启动")
+        
+        keeper = LeaseKeeper(work_queue, worker_id, lease_seconds).start()
+        # 已领取但尚未完成的图片任务（整批领取后立即登记，结束时未完成的全部退回）
+        leased = {}
+        
+        def leased_images():
+            while True:
+                items = work_queue.lease(KIND_IMAGE, worker_id, limit=self.max_workers,
+                                         lease_seconds=lease_seconds)
+                if not items:
+                    threads = work_queue.lease(KIND_THREAD, worker_id, lease_seconds=lease_seconds)
+                    if threads:
+                        keeper.hold(threads[0].id)
+                        try:
+                            self._expand_thread(work_queue, threads[0], worker_id)
+                        finally:
+                            keeper.release(threads[0].id)
+                        continue
+                    # 其他节点仍有进行中的任务时继续等待，它们可能展开出新任务或租约过期
+                    if work_queue.is_drained():
+                        return
+                    time.sleep(poll_interval)
+                    continue
+                
+                for item in items:
+                    keeper.hold(item.id)
+                    leased[item.url] = item
+                for item in items:
+                    yield item.url, (item.payload or {}).get('referer')
+        
+        success = 0
+        try:
+            for img_url, result in self.iter_downloads(leased_images(), None, max_images=0):
+                item = leased.pop(img_url)
+                if result:
+                    success += 1
+                    work_queue.ack(item.id, worker_id, result)
+                else:
+                    work_queue.nack(item.id, worker_id, '下载失败')
+                keeper.release(item.id)
+        finally:
+            # 配额用完或出错提前结束时，退回未下载的任务，不必等租约过期，也不计入重试次数
+            for item in leased.values():
+                try:
+                    work_queue.release(item.id, worker_id)
+                except Exception as e:
+                    print(f"退回任务失败 {item.url}: {e}")
+            if leased:
+                print(f"已退回 {len(leased)} 个未下载的图片任务")
+            keeper.stop()
+        
+        if self.transcoder:
+            report_file = os.path.join(self.output_dir, f'transcode_report_{worker_id}.txt')
+            with open(report_file, 'w', encoding='utf-8') as f:
+                self.write_transcode_report(f)
+        
+        print(f"\n工作节点 {worker_id} 结束，成功下载 {success} 张图片")
+        if self.http2:
+            print("HTTP/2连接统计:")
+            for line in self.http2.summary_lines():
+                print(f"  {line}")
+        return success
+
+
+def reextract_archive(archive_dir, output_file, workers=None, backend='regex'):
+    """
+    离线重新提取
+    对归档中的全部页面重新运行图片链接提取，多进程并行，不访问网络
+    
+    Args:
+        archive_dir: 页面归档目录
+        output_file: 结果文件（jsonl，每行一个页面）
+        workers: 进程数（默认为CPU核数）
+        backend: 解析后端名称
+    
+    Returns:
+        提取到的链接总数
+    
+    Raises:
+        FileNotFoundError: 归档目录不存在
+    """
+    get_extractor(backend)  # 提前检查依赖
+    archive = PageArchive(archive_dir, create=False)
+    entries = list(archive.entries())
+    if not entries:
+        print(f"归档为空: {archive_dir}")
+        return 0
+    
+    workers = workers or os.cpu_count() or 1
+    print(f"离线提取 {len(entries)} 个页面，进程数 {workers}，解析后端 {backend}...")
+    
+    def pages():
+        # 在主进程中按需解压，由extract_pages分批送入进程池
+        for entry in entries:
+            _, body = archive.read(entry)
+            yield body.decode('utf-8', errors='replace'), entry['url']
+    
+    start = time.perf_counter()
+    total_urls = 0
+    chunksize = max(1, min(16, len(entries) // (workers * 4)))
+    with open(output_file, 'w', encoding='utf-8') as f:
+        for entry, urls in zip(entries, extract_pages(pages(), backend, workers=workers,
+                                                      chunksize=chunksize)):
+            total_urls += len(urls)
+            f.write(json.dumps({
+                'url': entry['url'],
+                'time': entry['time'],
+                'count': len(urls),
+                'images': urls,
+            }, ensure_ascii=False) + '\n')
+    elapsed = time.perf_counter() - start
+    
+    print(f"完成: {len(entries)} 个页面, {total_urls} 个图片链接, "
+          f"耗时 {elapsed:.2f}秒 ({len(entries) / elapsed:.1f} 页/秒)")
+    print(f"结果已保存到: {output_file}")
+    return total_urls
 
 
 def main():
     parser = argparse.ArgumentParser(description='优化论坛图片抓取工具')
-    parser.add_argument('--url', required=True, help='目标网页URL')
+    parser.add_argument('--url', help='目标网页URL')
     parser.add_argument('--output-dir', default='./forum_images', help='输出目录')
+    parser.add_argument('--archive-dir', default=None, help='页面归档目录（默认为输出目录下的page_archive）')
+    parser.add_argument('--no-archive', action='store_true', help='不归档抓取的页面')
+    parser.add_argument('--parser', choices=list(BACKENDS), default='regex', help='图片链接解析后端')
+    parser.add_argument('--max-bandwidth', type=float, default=0, help='全局下载带宽上限(MB/s，0表示不限速)')
+    parser.add_argument('--proxy-bandwidth', type=float, default=0, help='单个代理带宽上限(MB/s，0表示不限速)')
+    parser.add_argument('--quota-mb', type=float, default=0, help='流量配额(MB)，用完后停止开始新下载')
+    parser.add_argument('--quota-period', choices=list(QUOTA_PERIODS), default='month',
+                        help='配额周期：month（按月）、day（按日）或total（不重置）')
+    parser.add_argument('--usage-db', default=default_usage_db(),
+                        help='代理流量记录文件，本机使用同一代理的进程共享带宽上限和配额（空字符串表示只在本进程内统计）')
+    parser.add_argument('--status-interval', type=float, default=10, help='状态行输出间隔(秒，0表示不输出)')
+    parser.add_argument('--transcode', choices=TRANSCODE_TARGETS, default=None,
+                        help='下载后转码：webp/avif重新编码，optimize为原格式无损优化（JPEG需要jpegtran）')
+    parser.add_argument('--transcode-quality', type=int, default=80, help='转码质量(1-100)')
+    parser.add_argument('--max-dimension', type=int, default=0, help='转码时的最大边长(像素，0表示不限制)')
+    parser.add_argument('--transcode-workers', type=int, default=None, help='转码进程数（默认为CPU核数）')
+    parser.add_argument('--keep-original', action='store_true', help='转码后保留原文件')
+    parser.add_argument('--http2', action='store_true', help="图片下载使用HTTP/2多路复用（需要 pip install 'httpx[http2]'）")
+    parser.add_argument('--queue', metavar='QUEUE', help='共享工作队列（本机 ./queue.db 或队列服务 http://host:8765），以分布式节点方式运行')
+    parser.add_argument('--worker-id', default=None, help='节点标识（默认 主机名-进程号）')
+    parser.add_argument('--lease-seconds', type=int, default=120, help='任务租约时长(秒)')
+    parser.add_argument('--offline', metavar='ARCHIVE_DIR', help='离线模式：对归档中的全部页面重新提取图片链接')
+    parser.add_argument('--offline-workers', type=int, default=None, help='离线模式进程数（默认为CPU核数）')
     parser.add_argument('--min-width', type=int, default=600, help='最小宽度')
     parser.add_argument('--min-height', type=int, default=600, help='最小高度')
     parser.add_argument('--workers', type=int, default=6, help='并发线程数')
     parser.add_argument('--delay-min', type=float, default=1.0, help='最小延迟(秒)')
     parser.add_argument('--delay-max', type=float, default=3.0, help='最大延迟(秒)')
-    parser.add_argument('--max-images', type=int, default=50, help='最大下载数量')
+    parser.add_argument('--max-images', type=int, default=50, help='最大下载数量（0表示不限制）')
+    parser.add_argument('--queue-size', type=int, default=None, help='待下载队列长度（默认为线程数的2倍）')
+    parser.add_argument('--max-inflight-mb', type=float, default=64, help='所有线程在途数据上限(MB，0表示不限制)')
+    parser.add_argument('--per-host-limit', type=int, default=0, help='单站点同时下载数上限（0表示不限制）')
+    parser.add_argument('--host-limit', action='append', default=[], metavar='HOST=N',
+                        help='指定站点的同时下载数上限，可重复使用')
+    parser.add_argument('--prefer-reliable-hosts', action='store_true', help='历史成功率高的站点优先调度')
     parser.add_argument('--proxy', help='代理服务器地址')
     parser.add_argument('--use-cookies', action='store_true', help='使用Cookies')
     parser.add_argument('--retries', type=int, default=3, help='重试次数')
     
     args = parser.parse_args()
     
+    # 离线模式不需要网络
+    if args.offline:
+        if not os.path.isdir(args.offline):
+            parser.error(f'归档目录不存在: {args.offline}')
+        os.makedirs(args.output_dir, exist_ok=True)
+        output_file = os.path.join(args.output_dir, 'reextract.jsonl')
+        reextract_archive(args.offline, output_file, workers=args.offline_workers,
+                          backend=args.parser)
+        return
+    
+    if not args.url and not args.queue:
+        parser.error('需要 --url、--queue 或 --offline')
+    
+    # 解析 HOST=N 形式的站点上限
+    host_limits = {}
+    for item in args.host_limit:
+        host, _, limit = item.partition('=')
+        if not limit.isdigit():
+            parser.error(f'--host-limit 格式应为 HOST=N: {item}')
+        host_limits[host.strip().lower()] = int(limit)
+    
+    transcoder = None
+    if args.transcode:
+        transcoder = Transcoder(
+            target=args.transcode,
+            quality=args.transcode_quality,
+            max_dimension=args.max_dimension,
+            workers=args.transcode_workers,
+            keep_original=args.keep_original
+        )
+    
     # 创建抓取器
     scraper = OptimizedForumScraper(
         output_dir=args.output_dir,
@@ -486,11 +1261,44 @@ def main():
         max_workers=args.workers,
         delay_range=(args.delay_min, args.delay_max),
         proxy=args.proxy,
-        use_cookies=args.use_cookies
+        use_cookies=args.use_cookies,
+        max_images=args.max_images,
+        queue_size=args.queue_size,
+        max_inflight_bytes=int(args.max_inflight_mb * 1024 * 1024),
+        per_host_limit=args.per_host_limit,
+        host_limits=host_limits,
+        prefer_reliable_hosts=args.prefer_reliable_hosts,
+        archive_dir='' if args.no_archive else args.archive_dir,
+        parser_backend=args.parser,
+        max_bandwidth=int(args.max_bandwidth * 1024 * 1024),
+        proxy_bandwidth=int(args.proxy_bandwidth * 1024 * 1024),
+        quota_bytes=int(args.quota_mb * 1024 * 1024),
+        usage_db=args.usage_db,
+        quota_period=args.quota_period,
+        status_interval=args.status_interval,
+        transcoder=transcoder,
+        http2=args.http2
     )
     
-    # 开始抓取
-    scraper.scrape(args.url)
+    try:
+        # 分布式模式：--url 作为帖子任务加入共享队列，然后从队列领取任务
+        if args.queue:
+            work_queue = open_work_queue(args.queue)
+            try:
+                if args.url:
+                    work_queue.put(KIND_THREAD, args.url)
+                scraper.run_worker(work_queue, worker_id=args.worker_id, lease_seconds=args.lease_seconds)
+            finally:
+                work_queue.close()
+            return
+        
+        # 开始抓取
+        scraper.scrape(args.url)
+    finally:
+        if transcoder:
+            transcoder.shutdown()
+        if scraper.http2:
+            scraper.http2.close()
 
 
 if __name__ == '__main__':
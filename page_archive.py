@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+页面归档
+每次抓取的页面按记录压缩后追加写入归档文件（类WARC格式），
+并在索引中记录URL、抓取时间和偏移量，便于离线重新提取
+"""
+
+import os
+import gzip
+import json
+import time
+import argparse
+import threading
+
+try:
+    import fcntl  # 多进程共用同一归档时加文件锁（Windows上没有，只保证进程内线程安全）
+except ImportError:
+    fcntl = None
+
+try:
+    import zstandard  # 可选：更快更小的压缩
+except ImportError:
+    zstandard = None
+
+
+# 各压缩格式对应的归档文件名
+ARCHIVE_FILES = {
+    'gzip': 'pages.warc.gz',
+    'zstd': 'pages.warc.zst',
+}
+INDEX_FILE = 'index.jsonl'
+
+
+def default_codec():
+    """安装了zstandard时使用zstd，否则使用gzip"""
+    return 'zstd' if zstandard is not None else 'gzip'
+
+
+def compress(data: bytes, codec: str):
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def decompress(data: bytes, codec: str):
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("读取zstd记录需要安装: pip install zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def build_record(url: str, fetch_time: float, body: bytes, status=200, content_type='text/html'):
+    """生成一条WARC风格的记录：头部 + 空行 + 页面内容"""
+    warc_date = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(fetch_time))
+    header = (
+        "WARC/1.0\r\n"
+        "WARC-Type: response\r\n"
+        f"WARC-Target-URI: {url}\r\n"
+        f"WARC-Date: {warc_date}\r\n"
+        f"HTTP-Status: {status}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "\r\n"
+    )
+    return header.encode('utf-8') + body + b"\r\n\r\n"
+
+
+def parse_record(data: bytes):
+    """解析记录，返回 (头部字典, 页面内容)"""
+    head, _, rest = data.partition(b"\r\n\r\n")
+    headers = {}
+    for line in head.decode('utf-8').split("\r\n")[1:]:
+        key, _, value = line.partition(':')
+        headers[key.strip()] = value.strip()
+    length = int(headers.get('Content-Length', len(rest)))
+    return headers, rest[:length]
+
+
+class PageArchive:
+    """
+    只追加的压缩页面归档
+
+    目录结构:
+        pages.warc.gz / pages.warc.zst  每条记录独立压缩后顺序追加
+        index.jsonl                     每行一条索引：URL、抓取时间、格式、偏移量、长度
+    """
+
+    def __init__(self, archive_dir, codec=None, create=True):
+        """
+        Args:
+            archive_dir: 归档目录
+            codec: 压缩格式，'gzip' 或 'zstd'（默认有zstandard时用zstd）
+            create: 目录不存在时是否创建（只读使用时应为False，目录不存在抛出FileNotFoundError）
+        """
+        self.archive_dir = archive_dir
+        self.codec = codec or default_codec()
+        if self.codec not in ARCHIVE_FILES:
+            raise ValueError(f"不支持的压缩格式: {self.codec}")
+        if self.codec == 'zstd' and zstandard is None:
+            raise RuntimeError("zstd压缩需要安装: pip install zstandard")
+
+        self.index_path = os.path.join(archive_dir, INDEX_FILE)
+        self._lock = threading.Lock()
+
+        if create:
+            os.makedirs(archive_dir, exist_ok=True)
+        elif not os.path.isdir(archive_dir):
+            raise FileNotFoundError(f"归档目录不存在: {archive_dir}")
+
+    def append(self, url: str, body, fetch_time=None, status=200, content_type='text/html'):
+        """
+        追加一条页面记录
+
+        Args:
+            url: 页面URL
+            body: 页面内容（str按utf-8编码）
+            fetch_time: 抓取时间戳（默认当前时间）
+
+        Returns:
+            索引条目
+        """
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        fetch_time = time.time() if fetch_time is None else fetch_time
+
+        record = compress(build_record(url, fetch_time, body, status, content_type), self.codec)
+        filename = ARCHIVE_FILES[self.codec]
+
+        with self._lock, open(os.path.join(self.archive_dir, filename), 'ab') as f:
+            # 同一台机器上的多个抓取进程可能共用归档，取偏移量到写完索引期间持有文件锁，
+            # 否则其他进程的追加可能落在取偏移量和写入之间，索引指向错误位置
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                f.seek(0, os.SEEK_END)
+                offset = f.tell()
+                f.write(record)
+                f.flush()
+
+                entry = {
+                    'url': url,
+                    'time': fetch_time,
+                    'file': filename,
+                    'codec': self.codec,
+                    'offset': offset,
+                    'length': len(record),
+                    'size': len(body),
+                }
+                # 先写数据再写索引，中途崩溃只会留下无索引的尾部数据
+                with open(self.index_path, 'a', encoding='utf-8') as index:
+                    index.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+        return entry
+
+    def entries(self):
+        """按写入顺序遍历索引条目"""
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+    def find(self, url: str):
+        """返回某个URL的所有索引条目，按抓取时间排序"""
+        return sorted((e for e in self.entries() if e['url'] == url), key=lambda e: e['time'])
+
+    def read(self, entry):
+        """读取索引条目对应的记录，返回 (头部字典, 页面内容bytes)"""
+        with open(os.path.join(self.archive_dir, entry['file']), 'rb') as f:
+            f.seek(entry['offset'])
+            data = f.read(entry['length'])
+        return parse_record(decompress(data, entry['codec']))
+
+    def get(self, url: str, at=None):
+        """
+        读取某个URL的页面内容
+
+        Args:
+            url: 页面URL
+            at: 时间戳，返回此时间之前最近的一次抓取（默认最新）
+
+        Returns:
+            页面内容str，没有记录时返回None
+        """
+        candidates = [e for e in self.find(url) if at is None or e['time'] <= at]
+        if not candidates:
+            return None
+        _, body = self.read(candidates[-1])
+        return body.decode('utf-8', errors='replace')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='页面归档查看工具')
+    parser.add_argument('archive_dir', help='归档目录')
+    parser.add_argument('--url', help='导出指定URL的最新页面')
+    args = parser.parse_args()
+
+    try:
+        archive = PageArchive(args.archive_dir, create=False)
+    except FileNotFoundError as e:
+        parser.error(str(e))
+
+    if args.url:
+        html = archive.get(args.url)
+        if html is None:
+            print(f"归档中没有该URL: {args.url}")
+            return
+        print(html)
+        return
+
+    for entry in archive.entries():
+        fetch_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['time']))
+        print(f"{fetch_time}  {entry['size'] // 1024:>6}KB  {entry['url']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+代理流量记录
+按代理记录已用流量并做令牌桶限速，状态保存在SQLite文件中：
+同一台机器上使用同一代理的多个抓取进程共享带宽上限，
+流量配额按周期（月/日）跨进程、跨运行累计，对应代理合同的计费方式
+"""
+
+import os
+import time
+import sqlite3
+import argparse
+import threading
+
+
+# 配额周期
+PERIODS = {
+    'month': '%Y-%m',
+    'day': '%Y-%m-%d',
+    'total': 'total',
+}
+
+
+def default_usage_db():
+    """默认记录文件: ~/.forum_scraper/usage.db"""
+    return os.path.join(os.path.expanduser('~'), '.forum_scraper', 'usage.db')
+
+
+def current_period(period='month', now=None):
+    """当前周期的标识，如 '2024-05'"""
+    fmt = PERIODS[period]
+    return fmt if fmt == 'total' else time.strftime(fmt, time.localtime(now))
+
+
+class ProxyUsage:
+    """
+    单个代理的共享流量记录和限速
+    consume() 在一个事务中累计用量并扣减令牌，令牌不足时在事务外睡眠补足
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS buckets (
+            key     TEXT PRIMARY KEY,
+            tokens  REAL NOT NULL,
+            last    REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS usage (
+            key     TEXT NOT NULL,
+            period  TEXT NOT NULL,
+            bytes   INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (key, period)
+        );
+    """
+
+    def __init__(self, path, key, rate=0, period='month'):
+        """
+        Args:
+            path: 记录文件路径
+            key: 代理标识（通常为代理地址）
+            rate: 带宽上限（字节/秒，0表示只记录用量不限速）
+            period: 配额周期 'month'、'day' 或 'total'
+        """
+        if period not in PERIODS:
+            raise ValueError(f"未知的配额周期: {period}（可选: {', '.join(PERIODS)}）")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.key = key
+        self.rate = rate
+        self.capacity = rate  # 允许1秒的突发
+        self.period = period
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(self.SCHEMA)
+
+    def _transaction(self, func):
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                result = func(self._conn)
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+            return result
+
+    def consume(self, n):
+        """记录n字节用量，设置了带宽上限时令牌不足则阻塞"""
+        if not n:
+            return
+
+        def run(conn):
+            # 多个进程共享，使用墙上时间
+            now = time.time()
+            conn.execute(
+                "INSERT INTO usage (key, period, bytes) VALUES (?, ?, ?) "
+                "ON CONFLICT (key, period) DO UPDATE SET bytes = bytes + excluded.bytes",
+                (self.key, current_period(self.period, now), n)
+            )
+            if not self.rate:
+                return 0
+            row = conn.execute("SELECT tokens, last FROM buckets WHERE key = ?", (self.key,)).fetchone()
+            tokens = self.capacity if row is None else \
+                min(self.capacity, row[0] + max(0.0, now - row[1]) * self.rate)
+            tokens -= n
+            conn.execute(
+                "INSERT INTO buckets (key, tokens, last) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET tokens = excluded.tokens, last = excluded.last",
+                (self.key, tokens, now)
+            )
+            return -tokens / self.rate if tokens < 0 else 0
+
+        wait = self._transaction(run)
+        if wait:
+            time.sleep(wait)
+
+    def used(self):
+        """当前周期已用字节数（所有进程合计）"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT bytes FROM usage WHERE key = ? AND period = ?",
+                (self.key, current_period(self.period))
+            ).fetchone()
+        return row[0] if row else 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='代理流量记录查看')
+    parser.add_argument('--usage-db', default=default_usage_db(), help='记录文件')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.usage_db):
+        print(f"没有流量记录: {args.usage_db}")
+        return
+    conn = sqlite3.connect(args.usage_db)
+    mb = 1024 * 1024
+    for key, period, used in conn.execute("SELECT key, period, bytes FROM usage ORDER BY key, period"):
+        print(f"{key:<40}{period:<12}{used / mb:>10.1f}MB")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
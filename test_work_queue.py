@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+工作队列测试：租约、续约、过期回收、重试次数，以及HTTP队列服务
+运行: python -m pytest test_work_queue.py 或 python -m unittest test_work_queue
+"""
+
+import os
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+
+from work_queue import (
+    DONE, FAILED, KIND_IMAGE, KIND_THREAD, LEASED, PENDING,
+    HttpWorkQueue, SQLiteWorkQueue, WorkQueue, make_queue_server, open_work_queue,
+)
+
+
+class SQLiteWorkQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='work_queue_test_')
+        self.queue = self.open_queue()
+
+    def tearDown(self):
+        self.queue.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def open_queue(self, max_attempts=3):
+        return SQLiteWorkQueue(os.path.join(self.tmp, 'queue.db'), max_attempts=max_attempts)
+
+    def state_count(self, state, kind=KIND_IMAGE):
+        return self.queue.counts().get((kind, state), 0)
+
+    def test_put_ignores_duplicates(self):
+        self.assertTrue(self.queue.put(KIND_IMAGE, 'http://a/1.jpg'))
+        self.assertFalse(self.queue.put(KIND_IMAGE, 'http://a/1.jpg'))
+        self.assertEqual(self.queue.put_many(KIND_IMAGE, [('http://a/1.jpg', None), ('http://a/2.jpg', None)]), 1)
+        # 不同类型的同一URL是不同任务
+        self.assertTrue(self.queue.put(KIND_THREAD, 'http://a/1.jpg'))
+
+    def test_lease_is_exclusive(self):
+        self.queue.put_many(KIND_IMAGE, [(f'http://a/{i}.jpg', {'referer': 'r'}) for i in range(4)])
+        first = self.queue.lease(KIND_IMAGE, 'w1', limit=3)
+        second = self.queue.lease(KIND_IMAGE, 'w2', limit=3)
+        self.assertEqual(len(first), 3)
+        self.assertEqual(len(second), 1)
+        self.assertFalse({item.id for item in first} & {item.id for item in second})
+        self.assertEqual(first[0].payload, {'referer': 'r'})
+        self.assertEqual(first[0].attempts, 1)
+        self.assertEqual(self.queue.lease(KIND_IMAGE, 'w3'), [])
+
+    def test_ack_requires_owner(self):
+        self.queue.put(KIND_IMAGE, 'http://a/1.jpg')
+        item, = self.queue.lease(KIND_IMAGE, 'w1')
+        self.assertFalse(self.queue.ack(item.id, 'w2'))
+        self.assertTrue(self.queue.ack(item.id, 'w1', {'path': 'x.jpg'}))
+        self.assertEqual(self.state_count(DONE), 1)
+        self.assertTrue(self.queue.is_drained())
+
+    def test_expired_lease_returns_to_queue(self):
+        self.queue.put(KIND_IMAGE, 'http://a/1.jpg')
+        item, = self.queue.lease(KIND_IMAGE, 'dead', lease_seconds=0.1)
+        self.assertEqual(self.queue.lease(KIND_IMAGE, 'alive'), [])
+        time.sleep(0.2)
+        again, = self.queue.lease(KIND_IMAGE, 'alive')
+        self.assertEqual(again.id, item.id)
+        self.assertEqual(again.attempts, 2)
+        # 原持有者的租约已失效
+        self.assertFalse(self.queue.ack(item.id, 'dead'))
+        self.assertTrue(self.queue.ack(item.id, 'alive'))
+
+    def test_heartbeat_extends_lease(self):
+        self.queue.put(KIND_IMAGE, 'http://a/1.jpg')
+        item, = self.queue.lease(KIND_IMAGE, 'w1', lease_seconds=0.3)
+        time.sleep(0.2)
+        self.assertEqual(self.queue.heartbeat([item.id], 'w1', lease_seconds=0.3), 1)
+        # 只能为自己持有的任务续约
+        self.assertEqual(self.queue.heartbeat([item.id], 'w2', lease_seconds=10), 0)
+        time.sleep(0.2)
+        self.assertEqual(self.queue.lease(KIND_IMAGE, 'w2'), [])
+        self.assertEqual(self.state_count(LEASED), 1)
+
+    def test_nack_fails_after_max_attempts(self):
+        self.queue.close()
+        self.queue = self.open_queue(max_attempts=2)
+        self.queue.put(KIND_IMAGE, 'http://a/1.jpg')
+        for _ in range(2):
+            item, = self.queue.lease(KIND_IMAGE, 'w1')
+            self.assertTrue(self.queue.nack(item.id, 'w1', 'error'))
+        self.assertEqual(self.state_count(FAILED), 1)
+        self.assertEqual(self.queue.lease(KIND_IMAGE, 'w1'), [])
+
+    def test_expiry_fails_after_max_attempts(self):
+        self.queue.close()
+        self.queue = self.open_queue(max_attempts=2)
+        self.queue.put(KIND_IMAGE, 'http://a/1.jpg')
+        for _ in range(2):
+            self.assertEqual(len(self.queue.lease(KIND_IMAGE, 'w1', lease_seconds=0.05)), 1)
+            time.sleep(0.1)
+        self.assertEqual(self.state_count(FAILED), 1)
+        self.assertEqual(self.state_count(PENDING), 0)
+        self.assertTrue(self.queue.is_drained())
+
+    def test_release_does_not_use_attempt(self):
+        self.queue.close()
+        self.queue = self.open_queue(max_attempts=1)
+        self.queue.put(KIND_IMAGE, 'http://a/1.jpg')
+        for _ in range(3):
+            item, = self.queue.lease(KIND_IMAGE, 'w1')
+            self.assertEqual(item.attempts, 1)
+            self.assertFalse(self.queue.release(item.id, 'w2'))
+            self.assertTrue(self.queue.release(item.id, 'w1'))
+        self.assertEqual(self.state_count(PENDING), 1)
+        item, = self.queue.lease(KIND_IMAGE, 'w1')
+        self.assertTrue(self.queue.nack(item.id, 'w1'))
+        self.assertEqual(self.state_count(FAILED), 1)
+
+    def test_shared_between_connections(self):
+        other = self.open_queue()
+        try:
+            self.queue.put(KIND_IMAGE, 'http://a/1.jpg')
+            item, = other.lease(KIND_IMAGE, 'w2')
+            self.assertEqual(self.queue.lease(KIND_IMAGE, 'w1'), [])
+            self.assertTrue(other.ack(item.id, 'w2'))
+        finally:
+            other.close()
+
+
+class HttpWorkQueueTest(SQLiteWorkQueueTest):
+    """通过队列服务访问，行为应与直接使用SQLite队列一致"""
+
+    def open_queue(self, max_attempts=3):
+        backend = SQLiteWorkQueue(os.path.join(self.tmp, 'queue.db'), max_attempts=max_attempts)
+        server = make_queue_server(backend, port=0, token='secret')
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        host, port = server.server_address
+        queue = open_work_queue(f'http://{host}:{port}/?token=secret')
+        self.assertIsInstance(queue, HttpWorkQueue)
+
+        close = queue.close
+
+        def close_all():
+            close()
+            server.shutdown()
+            server.server_close()
+            backend.close()
+        queue.close = close_all
+        queue.url = f'http://{host}:{port}'
+        return queue
+
+    def test_token_required(self):
+        queue = HttpWorkQueue(self.queue.url, token='wrong')
+        with self.assertRaises(RuntimeError):
+            queue.counts()
+
+
+class WorkQueueInterfaceTest(unittest.TestCase):
+
+    def test_abstract(self):
+        with self.assertRaises(TypeError):
+            WorkQueue()
+
+    def test_open_work_queue_rejects_unknown_scheme(self):
+        with self.assertRaises(ValueError):
+            open_work_queue('redis://localhost/0')
+
+
+if __name__ == '__main__':
+    unittest.main()
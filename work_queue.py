@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多节点共享工作队列
+任务（帖子链接、图片链接）以租约方式领取：
+领取后需定期续约（heartbeat），完成后确认（ack）；
+节点崩溃导致租约过期的任务会自动回到队列，由其他节点重新领取
+
+后端：
+- SQLiteWorkQueue: 本地文件，仅限同一台机器上的多个进程（也用于本地测试）
+- HttpWorkQueue:   连接 `python work_queue.py queue.db --serve` 启动的队列服务，供多台机器共用
+"""
+
+import os
+import abc
+import json
+import time
+import socket
+import sqlite3
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+# 任务类型
+KIND_THREAD = 'thread'
+KIND_IMAGE = 'image'
+
+# 任务状态
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+WorkItem = namedtuple('WorkItem', ['id', 'kind', 'url', 'payload', 'attempts'])
+
+
+def default_worker_id():
+    """主机名-进程号，用于标识租约持有者"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkQueue(abc.ABC):
+    """
+    工作队列接口
+    实现方需保证lease的原子性：同一任务同一时刻只能被一个节点持有
+    """
+
+    @abc.abstractmethod
+    def put(self, kind, url, payload=None):
+        """加入任务，同类型同URL已存在时忽略，返回是否新加入"""
+
+    def put_many(self, kind, items):
+        """批量加入 [(url, payload), ...]，返回新加入数量"""
+        return sum(1 for url, payload in items if self.put(kind, url, payload))
+
+    @abc.abstractmethod
+    def lease(self, kind, worker_id, limit=1, lease_seconds=120):
+        """领取最多limit个任务，返回WorkItem列表"""
+
+    @abc.abstractmethod
+    def heartbeat(self, item_ids, worker_id, lease_seconds=120):
+        """为持有的任务续约，返回续约成功的数量"""
+
+    @abc.abstractmethod
+    def ack(self, item_id, worker_id, result=None):
+        """确认完成，租约已失效时返回False"""
+
+    @abc.abstractmethod
+    def nack(self, item_id, worker_id, error=None):
+        """放弃任务，未超过重试次数时回到队列"""
+
+    @abc.abstractmethod
+    def release(self, item_id, worker_id):
+        """退回未尝试的任务，回到队列且不计入重试次数"""
+
+    @abc.abstractmethod
+    def counts(self):
+        """各状态任务数 {(类型, 状态): 数量}"""
+
+    def is_drained(self):
+        """没有待领取和进行中的任务"""
+        counts = self.counts()
+        return not any(n for (_, state), n in counts.items() if state in (PENDING, LEASED))
+
+    def close(self):
+        pass
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """
+    基于SQLite文件的工作队列
+    仅限同一台机器上的多个进程共用：WAL模式依赖本机共享内存，
+    SQLite的文件锁在NFS/SMB等网络文件系统上也不可靠；
+    多台机器共用时在一台机器上以 --serve 运行，其他机器通过HttpWorkQueue访问
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS items (
+            id            INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind          TEXT NOT NULL,
+            url           TEXT NOT NULL,
+            payload       TEXT,
+            state         TEXT NOT NULL DEFAULT 'pending',
+            owner         TEXT,
+            lease_expires REAL,
+            attempts      INTEGER NOT NULL DEFAULT 0,
+            result        TEXT,
+            updated       REAL,
+            UNIQUE (kind, url)
+        );
+        CREATE INDEX IF NOT EXISTS items_state ON items (kind, state, id);
+    """
+
+    def __init__(self, path, max_attempts=3):
+        """
+        Args:
+            path: 数据库文件路径
+            max_attempts: 单个任务最多领取次数，超过后标记为失败
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(self.SCHEMA)
+
+    def _transaction(self, func):
+        # BEGIN IMMEDIATE 在事务开始时就加写锁，保证多进程领取互斥
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                result = func(self._conn)
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+            return result
+
+    def _expire(self, conn, now):
+        # 回收过期租约，超过重试次数的直接标记失败
+        conn.execute(
+            "UPDATE items SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+            "owner = NULL, lease_expires = NULL, updated = ? "
+            "WHERE state = ? AND lease_expires < ?",
+            (self.max_attempts, FAILED, PENDING, now, LEASED, now)
+        )
+
+    def put(self, kind, url, payload=None):
+        def run(conn):
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO items (kind, url, payload, updated) VALUES (?, ?, ?, ?)",
+                (kind, url, json.dumps(payload, ensure_ascii=False), time.time())
+            )
+            return cursor.rowcount > 0
+        return self._transaction(run)
+
+    def put_many(self, kind, items):
+        def run(conn):
+            now = time.time()
+            added = 0
+            for url, payload in items:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO items (kind, url, payload, updated) VALUES (?, ?, ?, ?)",
+                    (kind, url, json.dumps(payload, ensure_ascii=False), now)
+                )
+                added += cursor.rowcount
+            return added
+        return self._transaction(run)
+
+    def lease(self, kind, worker_id, limit=1, lease_seconds=120):
+        def run(conn):
+            now = time.time()
+            self._expire(conn, now)
+            rows = conn.execute(
+                "SELECT id, kind, url, payload, attempts FROM items "
+                "WHERE kind = ? AND state = ? ORDER BY id LIMIT ?",
+                (kind, PENDING, limit)
+            ).fetchall()
+            items = []
+            for item_id, item_kind, url, payload, attempts in rows:
+                conn.execute(
+                    "UPDATE items SET state = ?, owner = ?, lease_expires = ?, "
+                    "attempts = attempts + 1, updated = ? WHERE id = ?",
+                    (LEASED, worker_id, now + lease_seconds, now, item_id)
+                )
+                items.append(WorkItem(item_id, item_kind, url, json.loads(payload), attempts + 1))
+            return items
+        return self._transaction(run)
+
+    def heartbeat(self, item_ids, worker_id, lease_seconds=120):
+        item_ids = list(item_ids)
+        if not item_ids:
+            return 0
+
+        def run(conn):
+            now = time.time()
+            renewed = 0
+            for item_id in item_ids:
+                cursor = conn.execute(
+                    "UPDATE items SET lease_expires = ?, updated = ? "
+                    "WHERE id = ? AND owner = ? AND state = ?",
+                    (now + lease_seconds, now, item_id, worker_id, LEASED)
+                )
+                renewed += cursor.rowcount
+            return renewed
+        return self._transaction(run)
+
+    def ack(self, item_id, worker_id, result=None):
+        def run(conn):
+            cursor = conn.execute(
+                "UPDATE items SET state = ?, owner = NULL, lease_expires = NULL, "
+                "result = ?, updated = ? WHERE id = ? AND owner = ? AND state = ?",
+                (DONE, json.dumps(result, ensure_ascii=False), time.time(),
+                 item_id, worker_id, LEASED)
+            )
+            return cursor.rowcount > 0
+        return self._transaction(run)
+
+    def nack(self, item_id, worker_id, error=None):
+        def run(conn):
+            cursor = conn.execute(
+                "UPDATE items SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                "owner = NULL, lease_expires = NULL, result = ?, updated = ? "
+                "WHERE id = ? AND owner = ? AND state = ?",
+                (self.max_attempts, FAILED, PENDING,
+                 json.dumps(error, ensure_ascii=False), time.time(),
+                 item_id, worker_id, LEASED)
+            )
+            return cursor.rowcount > 0
+        return self._transaction(run)
+
+    def release(self, item_id, worker_id):
+        def run(conn):
+            cursor = conn.execute(
+                "UPDATE items SET state = ?, owner = NULL, lease_expires = NULL, "
+                "attempts = MAX(attempts - 1, 0), updated = ? "
+                "WHERE id = ? AND owner = ? AND state = ?",
+                (PENDING, time.time(), item_id, worker_id, LEASED)
+            )
+            return cursor.rowcount > 0
+        return self._transaction(run)
+
+    def counts(self):
+        def run(conn):
+            self._expire(conn, time.time())
+            rows = conn.execute("SELECT kind, state, COUNT(*) FROM items GROUP BY kind, state")
+            return {(kind, state): n for kind, state, n in rows}
+        return self._transaction(run)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class HttpWorkQueue(WorkQueue):
+    """
+    通过HTTP访问队列服务（python work_queue.py queue.db --serve）的客户端
+    多台机器共用一个队列时使用，租约的原子性由服务端的SQLite队列保证
+    """
+
+    def __init__(self, base_url, token=None, timeout=30):
+        """
+        Args:
+            base_url: 队列服务地址，如 http://10.0.0.5:8765
+            token: 访问令牌（服务端设置了--token时需要）
+            timeout: 单次请求超时（秒）
+        """
+        self.base_url = base_url.rstrip('/')
+        self.token = token
+        self.timeout = timeout
+        # 队列服务在内网，不走环境变量中的代理
+        self._opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+
+    def _call(self, method, **args):
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['X-Queue-Token'] = self.token
+        request = urllib.request.Request(f"{self.base_url}/{method}",
+                                         data=json.dumps(args, ensure_ascii=False).encode('utf-8'),
+                                         headers=headers, method='POST')
+        try:
+            with self._opener.open(request, timeout=self.timeout) as response:
+                return json.loads(response.read().decode('utf-8'))['result']
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read().decode('utf-8')).get('error', '')
+            except ValueError:
+                message = ''
+            raise RuntimeError(f"队列服务出错 {e.code}: {message or e.reason}")
+
+    def put(self, kind, url, payload=None):
+        return self._call('put', kind=kind, url=url, payload=payload)
+
+    def put_many(self, kind, items):
+        return self._call('put_many', kind=kind, items=[list(item) for item in items])
+
+    def lease(self, kind, worker_id, limit=1, lease_seconds=120):
+        items = self._call('lease', kind=kind, worker_id=worker_id, limit=limit,
+                           lease_seconds=lease_seconds)
+        return [WorkItem(**item) for item in items]
+
+    def heartbeat(self, item_ids, worker_id, lease_seconds=120):
+        item_ids = list(item_ids)
+        if not item_ids:
+            return 0
+        return self._call('heartbeat', item_ids=item_ids, worker_id=worker_id,
+                          lease_seconds=lease_seconds)
+
+    def ack(self, item_id, worker_id, result=None):
+        return self._call('ack', item_id=item_id, worker_id=worker_id, result=result)
+
+    def nack(self, item_id, worker_id, error=None):
+        return self._call('nack', item_id=item_id, worker_id=worker_id, error=error)
+
+    def release(self, item_id, worker_id):
+        return self._call('release', item_id=item_id, worker_id=worker_id)
+
+    def counts(self):
+        return {(kind, state): n for kind, state, n in self._call('counts')}
+
+
+class QueueRequestHandler(BaseHTTPRequestHandler):
+    """队列服务的请求处理：POST /<方法名>，请求和响应都是JSON"""
+
+    METHODS = {'put', 'put_many', 'lease', 'heartbeat', 'ack', 'nack', 'release', 'counts'}
+
+    def _reply(self, code, body):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        method = self.path.strip('/')
+        if method not in self.METHODS:
+            self._reply(404, {'error': f"未知方法: {method}"})
+            return
+        token = self.server.token
+        if token and self.headers.get('X-Queue-Token') != token:
+            self._reply(403, {'error': '令牌错误'})
+            return
+        try:
+            args = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            result = getattr(self.server.work_queue, method)(**args)
+        except Exception as e:
+            self._reply(500, {'error': f"{type(e).__name__}: {e}"})
+            return
+        if method == 'lease':
+            result = [item._asdict() for item in result]
+        elif method == 'counts':
+            result = [[kind, state, n] for (kind, state), n in result.items()]
+        self._reply(200, {'result': result})
+
+    def log_message(self, format, *args):
+        # 节点轮询频繁，不输出访问日志
+        pass
+
+
+def make_queue_server(work_queue, host='127.0.0.1', port=8765, token=None):
+    """
+    创建队列服务（未启动），由调用方serve_forever()
+    port为0时自动分配端口，实际端口见 server.server_address
+    """
+    server = ThreadingHTTPServer((host, port), QueueRequestHandler)
+    server.daemon_threads = True
+    server.work_queue = work_queue
+    server.token = token
+    return server
+
+
+def open_work_queue(spec, **kwargs):
+    """
+    按地址打开工作队列
+    - http://host:port[?token=xxx]  队列服务（多台机器共用）
+    - sqlite:///path/to/queue.db 或直接给出文件路径（仅限本机）
+    """
+    if spec.startswith(('http://', 'https://')):
+        parts = urlsplit(spec)
+        token = parse_qs(parts.query).get('token', [None])[0]
+        return HttpWorkQueue(f"{parts.scheme}://{parts.netloc}{parts.path}", token=token)
+    if spec.startswith('sqlite://'):
+        spec = spec[len('sqlite://'):]
+        if spec.startswith('/') and spec[1:2] == '/':
+            spec = spec[1:]
+    if '://' in spec:
+        raise ValueError(f"不支持的队列地址: {spec}")
+    return SQLiteWorkQueue(spec, **kwargs)
+
+
+class LeaseKeeper:
+    """
+    后台续约线程
+    记录本节点持有的全部租约，定期统一续约
+    """
+
+    def __init__(self, work_queue, worker_id, lease_seconds=120, interval=None):
+        self.work_queue = work_queue
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        # 默认在租约过期前续约两次以上
+        self.interval = interval or max(1.0, lease_seconds / 3)
+        self._held = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='lease-keeper', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def hold(self, item_id):
+        with self._lock:
+            self._held.add(item_id)
+
+    def release(self, item_id):
+        with self._lock:
+            self._held.discard(item_id)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                held = list(self._held)
+            try:
+                self.work_queue.heartbeat(held, self.worker_id, self.lease_seconds)
+            except Exception as e:
+                print(f"续约失败: {e}")
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='工作队列管理')
+    parser.add_argument('queue', help='队列地址，如 ./queue.db 或 http://host:8765')
+    parser.add_argument('--add', nargs='*', default=[], help='加入帖子链接')
+    parser.add_argument('--add-file', help='从文件加入帖子链接（每行一个）')
+    parser.add_argument('--serve', action='store_true', help='以队列服务方式运行，供其他机器通过HTTP访问本机的SQLite队列')
+    parser.add_argument('--host', default='0.0.0.0', help='队列服务监听地址')
+    parser.add_argument('--port', type=int, default=8765, help='队列服务端口')
+    parser.add_argument('--token', default=None, help='队列服务访问令牌（客户端地址加 ?token=xxx）')
+    args = parser.parse_args()
+
+    work_queue = open_work_queue(args.queue)
+
+    urls = list(args.add)
+    if args.add_file:
+        with open(args.add_file, 'r', encoding='utf-8') as f:
+            urls += [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    if urls:
+        added = work_queue.put_many(KIND_THREAD, [(url, None) for url in urls])
+        print(f"加入 {added} 个帖子链接（{len(urls) - added} 个已存在）")
+
+    print("队列状态:")
+    for (kind, state), n in sorted(work_queue.counts().items()):
+        print(f"  {kind:<8}{state:<10}{n}")
+
+    if args.serve:
+        if not isinstance(work_queue, SQLiteWorkQueue):
+            parser.error('--serve 需要本地SQLite队列文件')
+        server = make_queue_server(work_queue, args.host, args.port, args.token)
+        print(f"队列服务已启动: http://{args.host}:{args.port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+    work_queue.close()
+
+if __name__ == '__main__':
+    main()